@@ -1,47 +1,146 @@
 from flask import Flask
 from dotenv import load_dotenv
+import atexit
+import logging
 import os
+from datetime import datetime
 from .logging_config import setup_logging
-from .telegram_notifier import send_telegram_message
+from .telegram_notifier import deliver_outbox, enqueue_telegram_message
 from .config import load_config
-from .state import State
-from .api_client import ApiClient
-from .data_manager import init_db, store_data
+from .meters import MeterRegistry
+from .db import close_all
+from .compaction import compact_raw_readings
+from .data_manager import (
+    follow_stored_readings, init_db, mark_data_changed, store_data, warm_start_state, warm_up_detectors,
+)
+from .leader import LeaderLock
+from .metrics import instrument_app, upstream_latency_listener, watch_scheduler
 from .views.dashboard import create_dashboard_bp
+from .views.metrics import create_metrics_bp
+from .write_behind import WriteBehindBuffer
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
+TELEGRAM_OUTBOX_INTERVAL_SECONDS = 5
+COMPACTION_INTERVAL_SECONDS = 3600
+# How often non-leader workers pick up new readings and retry for leadership.
+FOLLOWER_SYNC_SECONDS = 2
+
 def create_app():
     setup_logging()
     app = Flask(__name__)
     
     config = load_config()
-    state = State()
-    api_client = ApiClient(config)
+    meters = MeterRegistry.from_config(config)
     
     init_db(config.DATABASE)
+    for meter in meters:
+        warm_start_state(meter.state, config.DATABASE, meter.id)
     
-    dashboard_bp = create_dashboard_bp(api_client, config, state)
+    dashboard_bp = create_dashboard_bp(meters, config)
     app.register_blueprint(dashboard_bp, url_prefix='/')
+    app.register_blueprint(create_metrics_bp())
+    instrument_app(app)
     
+    from apscheduler.executors.pool import ThreadPoolExecutor
     from apscheduler.schedulers.background import BackgroundScheduler
     
-    scheduler = BackgroundScheduler()
+    # Each meter polls on its own jobs, so enough workers are needed for every
+    # meter's fetch and home-data refresh to overlap plus the global jobs.
+    scheduler = BackgroundScheduler(
+        executors={'default': ThreadPoolExecutor(2 * len(meters) + 4)}
+    )
+    
+    watch_scheduler(scheduler)
+    
+    for meter in meters:
+        meter.api_client.latency_listeners.append(upstream_latency_listener(meter.id))
+    
+    write_buffer = None
+    if config.WRITE_BEHIND_ROWS > 0:
+        write_buffer = WriteBehindBuffer(
+            config.DATABASE, config.WRITE_BEHIND_ROWS, config.WRITE_BEHIND_SECONDS
+        )
+
+        def on_flush(meter_ids):
+            # Responses cached while the rows were pending left them out.
+            for meter_id in meter_ids:
+                meter = meters.get(meter_id)
+                if meter is not None:
+                    mark_data_changed(meter.state)
+
+        write_buffer.flush_listeners.append(on_flush)
     
-    @scheduler.scheduled_job('interval', seconds=config.FETCH_INTERVAL_SECONDS)
-    def scheduled_fetch_data():
-        live_data = api_client.fetch_data()
+    # Under a multi-worker server every worker runs create_app, but only the
+    # lock holder fetches, stores and alerts; the rest follow its writes.
+    leader = LeaderLock(f'{config.DATABASE}.leader')
+    # The lock lives as long as its open file, so keep it referenced.
+    app.extensions['leader_lock'] = leader
+    if leader.try_acquire():
+        _schedule_leader_jobs(scheduler, meters, config, write_buffer)
+    else:
+        logger.info(f"Process {os.getpid()} is following the scheduler leader")
+
+        @scheduler.scheduled_job('interval', seconds=FOLLOWER_SYNC_SECONDS, id='follow_leader', max_instances=1, coalesce=True)
+        def follow_leader():
+            for meter in meters:
+                follow_stored_readings(meter.state, config.DATABASE, meter.id)
+                meter.home_data_cache.load()
+            if leader.try_acquire():
+                scheduler.remove_job('follow_leader')
+                for meter in meters:
+                    warm_up_detectors(meter.state, config.DATABASE, meter.id)
+                _schedule_leader_jobs(scheduler, meters, config, write_buffer)
+    
+    scheduler.start()
+    atexit.register(close_all)
+    if write_buffer is not None:
+        # Registered last so it runs first, while connections can still open.
+        atexit.register(write_buffer.flush)
+    
+    return app
+
+
+def _schedule_leader_jobs(scheduler, meters, config, write_buffer=None):
+    """Add the jobs that must run in exactly one process."""
+    for meter in meters:
+        _schedule_meter_jobs(scheduler, meter, write_buffer)
+
+    if write_buffer is not None:
+        scheduler.add_job(
+            write_buffer.flush, 'interval', seconds=config.WRITE_BEHIND_SECONDS,
+            id='flush_write_buffer', max_instances=1, coalesce=True
+        )
+
+    scheduler.add_job(
+        deliver_outbox, 'interval', args=(config,), seconds=TELEGRAM_OUTBOX_INTERVAL_SECONDS,
+        id='deliver_telegram_outbox', max_instances=1, coalesce=True
+    )
+    scheduler.add_job(
+        compact_raw_readings, 'interval', args=(config.DATABASE, config.RAW_RETENTION_DAYS),
+        seconds=COMPACTION_INTERVAL_SECONDS, id='compact_old_readings', max_instances=1, coalesce=True
+    )
+
+
+def _schedule_meter_jobs(scheduler, meter, write_buffer=None):
+    """Add the polling, home-data and daily-summary jobs for one meter."""
+    def fetch_data():
+        live_data = meter.api_client.fetch_data()
         if live_data:
-            store_data(live_data, state, config)
-            
-    @scheduler.scheduled_job('cron', hour=23, minute=59)
+            store_data(live_data, meter.state, meter.config, write_buffer)
+
+    def refresh_home_data():
+        meter.home_data_cache.refresh()
+
     def send_daily_summary():
-        home_data = api_client.fetch_home_data()
+        home_data, _ = meter.home_data_cache.refresh()
         if home_data and home_data.get('Data'):
             data = home_data['Data']
             
             message = (
-                f"*Daily Power Usage Summary*\n\n"
+                f"{meter.config.ALERT_PREFIX}*Daily Power Usage Summary*\n\n"
                 f"Today's EB Usage: Rs *{data.get('CurrentDay_EB', 0)}\n"
                 f"Today's DG Usage: Rs *{data.get('CurrentDay_DG', 0)}\n"
                 f"Month's EB Usage: Rs *{data.get('CurrentMonth_EB', 0)}\n"
@@ -49,8 +148,16 @@ def create_app():
                 f"Meter Balance: Rs *₹{data.get('MeterBal', 0)}*"
             )
             
-            send_telegram_message(message, config)
-    
-    scheduler.start()
-    
-    return app
+            enqueue_telegram_message(message, meter.config)
+
+    scheduler.add_job(
+        fetch_data, 'interval', seconds=meter.config.FETCH_INTERVAL_SECONDS,
+        id=f'fetch_data:{meter.id}', max_instances=1, coalesce=True
+    )
+    scheduler.add_job(
+        refresh_home_data, 'interval', seconds=meter.config.HOME_DATA_REFRESH_SECONDS,
+        next_run_time=datetime.now(), id=f'refresh_home_data:{meter.id}', max_instances=1, coalesce=True
+    )
+    scheduler.add_job(
+        send_daily_summary, 'cron', hour=23, minute=59, id=f'send_daily_summary:{meter.id}'
+    )
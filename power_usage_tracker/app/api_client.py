@@ -1,95 +1,194 @@
 import logging
-import requests
+import random
+import threading
 import time
 
-logger = logging.getLogger(__name__)
+import requests
+from requests.adapters import HTTPAdapter
 
-class ApiClient:
-    def __init__(self, config):
-        self.config = config
+from .config import DEFAULT_METER_ID
 
-    def fetch_data(self, retries=3, backoff_factor=0.5):
-        """Fetch data with retry mechanism and proper error handling"""
+logger = logging.getLogger(__name__)
+
+INPUT_TYPE = "PObKiG8pSHLNiMt7C0uIuYbdF0WNRXG5GvLp5gd5sdw="
+
+# (connect, read) timeouts per upstream endpoint, in seconds.
+LIVE_UPDATES_TIMEOUT = (3.05, 10)
+HOME_DATA_TIMEOUT = (2, 5)
+# Retries stop once the next attempt could run past this share of the
+# polling interval, so an outage never holds the job thread into its next run.
+RETRY_BUDGET_FRACTION = 0.5
+
+
+class CircuitOpenError(Exception):
+    """Raised when a call is short-circuited because the upstream keeps failing."""
+
+
+class CircuitBreaker:
+    """Stop calling an upstream after repeated failures.
+
+    After ``failure_threshold`` consecutive failed calls the circuit opens and
+    calls are rejected without touching the network for ``reset_timeout``
+    seconds. The first call after that is let through as a trial: success
+    closes the circuit, failure opens it again.
+    """
+
+    def __init__(self, name, failure_threshold=5, reset_timeout=120):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at = None
+        self._lock = threading.Lock()
+
+    @property
+    def is_open(self):
+        with self._lock:
+            return self._opened_at is not None
+
+    def before_call(self):
+        with self._lock:
+            if self._opened_at is None:
+                return
+            if time.monotonic() - self._opened_at < self.reset_timeout:
+                raise CircuitOpenError(f"{self.name} circuit is open")
+            # Half-open: allow this trial call, and re-open immediately if it fails.
+            self._failures = self.failure_threshold - 1
+            self._opened_at = None
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._failures >= self.failure_threshold and self._opened_at is None:
+                self._opened_at = time.monotonic()
+                logger.warning(
+                    f"{self.name} circuit opened after {self._failures} consecutive failures; "
+                    f"pausing calls for {self.reset_timeout}s"
+                )
 
-        if not self.config.LIVE_UPDATES_API_URL or not self.config.BEARER_TOKEN:
-            logger.critical("LIVE_UPDATES_API_URL and BEARER_TOKEN must be set")
-            return None
 
-        headers = {
+class ApiClient:
+    def __init__(self, config, session=None):
+        self.config = config
+        self.session = session or self._build_session()
+        self.headers = {
             'Authorization': f'Bearer {self.config.BEARER_TOKEN}',
             'User-Agent': 'okhttp/3.14.9',
             'Content-Type': 'application/json; charset=UTF-8'
         }
-
-        data = {
-            "InputType": "PObKiG8pSHLNiMt7C0uIuYbdF0WNRXG5GvLp5gd5sdw="
+        self.payload = {"InputType": self.config.INPUT_TYPE or INPUT_TYPE}
+        self.meter_id = getattr(config, 'METER_ID', DEFAULT_METER_ID)
+        self.breakers = {
+            endpoint: CircuitBreaker(self._label(endpoint))
+            for endpoint in ('live_updates', 'home_data')
         }
-        
+        self.last_latency = {}
+        self.latency_listeners = []
+
+    @staticmethod
+    def _build_session():
+        """Pooled keep-alive session shared by every upstream call."""
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=2, pool_maxsize=4)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        return session
+
+    def _label(self, endpoint):
+        """Name used in logs; the default meter keeps the bare endpoint name."""
+        if self.meter_id == DEFAULT_METER_ID:
+            return endpoint
+        return f"{self.meter_id}/{endpoint}"
+
+    def _record_latency(self, endpoint, seconds, outcome):
+        self.last_latency[endpoint] = seconds
+        logger.debug(f"{self._label(endpoint)} call {outcome} in {seconds * 1000:.0f} ms")
+        for listener in self.latency_listeners:
+            listener(endpoint, seconds, outcome)
+
+    def _post(self, endpoint, url, timeout, retries, backoff_factor, budget_seconds):
+        """POST with jittered exponential backoff behind a circuit breaker.
+
+        A retry is only made if its backoff plus a full timeout still fits in
+        ``budget_seconds`` from the first attempt, and never once the breaker
+        has opened; the next scheduled run tries again instead.
+        """
+        breaker = self.breakers[endpoint]
+        call_started = time.monotonic()
+
         for attempt in range(retries):
             try:
-                response = requests.post(
-                    self.config.LIVE_UPDATES_API_URL,
-                    headers=headers,
-                    json=data,
-                    timeout=10  # 10 second timeout
+                breaker.before_call()
+            except CircuitOpenError as e:
+                logger.warning(f"Skipping {breaker.name} request: {e}")
+                return None
+
+            started = time.perf_counter()
+            try:
+                response = self.session.post(
+                    url,
+                    headers=self.headers,
+                    json=self.payload,
+                    timeout=timeout
                 )
-                
                 response.raise_for_status()
-                
+
                 json_response = response.json()
                 if not isinstance(json_response, dict) or 'Data' not in json_response:
                     raise ValueError("Invalid API response format")
-                    
+
+                self._record_latency(endpoint, time.perf_counter() - started, 'ok')
+                breaker.record_success()
                 return json_response
-                
-            except requests.exceptions.RequestException as e:
-                logger.error(f"Request error (attempt {attempt+1}/{retries}): {e}")
-                if attempt < retries - 1:
-                    time.sleep(backoff_factor * (attempt + 1))
-                continue
-                
-        logger.critical("Failed to fetch data after maximum retries")
+
+            except (requests.exceptions.RequestException, ValueError) as e:
+                self._record_latency(endpoint, time.perf_counter() - started, 'error')
+                breaker.record_failure()
+                logger.error(f"{breaker.name} request error (attempt {attempt+1}/{retries}): {e}")
+                if attempt == retries - 1 or breaker.is_open:
+                    break
+                # Full jitter keeps retries from several clients out of lockstep.
+                delay = random.uniform(0, backoff_factor * (2 ** attempt))
+                if time.monotonic() - call_started + delay + sum(timeout) > budget_seconds:
+                    break
+                time.sleep(delay)
+
+        logger.critical(f"Failed to fetch {breaker.name} after {attempt + 1} attempt(s)")
         return None
 
-    def fetch_home_data(self, retries=3, backoff_factor=0.5):
-        """Fetch home data with retry mechanism and proper error handling"""
+    def fetch_data(self, retries=3, backoff_factor=0.5):
+        """Fetch live updates with retry, backoff and circuit breaking"""
 
-        if not self.config.HOME_DATA_API_URL or not self.config.BEARER_TOKEN:
-            logger.critical("HOME_DATA_API_URL and BEARER_TOKEN must be set")
+        if not self.config.LIVE_UPDATES_API_URL or not self.config.BEARER_TOKEN:
+            logger.critical("LIVE_UPDATES_API_URL and BEARER_TOKEN must be set")
             return None
 
-        headers = {
-            'Authorization': f'Bearer {self.config.BEARER_TOKEN}',
-            'User-Agent': 'okhttp/3.14.9',
-            'Content-Type': 'application/json; charset=UTF-8'
-        }
-
-        data = {
-            "InputType": "PObKiG8pSHLNiMt7C0uIuYbdF0WNRXG5GvLp5gd5sdw="
-        }
-
-        for attempt in range(retries):
-            try:
-                response = requests.post(
-                    self.config.HOME_DATA_API_URL,
-                    headers=headers,
-                    json=data,
-                    timeout=2  # 10 second timeout
-                )
-
-                response.raise_for_status()
-
-                json_response = response.json()
-                if not isinstance(json_response, dict) or 'Data' not in json_response:
-                    raise ValueError("Invalid API response format")
+        return self._post(
+            'live_updates',
+            self.config.LIVE_UPDATES_API_URL,
+            LIVE_UPDATES_TIMEOUT,
+            retries,
+            backoff_factor,
+            self.config.FETCH_INTERVAL_SECONDS * RETRY_BUDGET_FRACTION,
+        )
 
-                return json_response
+    def fetch_home_data(self, retries=3, backoff_factor=0.5):
+        """Fetch home data with retry, backoff and circuit breaking"""
 
-            except requests.exceptions.RequestException as e:
-                logger.error(f"Request error (attempt {attempt+1}/{retries}): {e}")
-                if attempt < retries - 1:
-                    time.sleep(backoff_factor * (attempt + 1))
-                continue
+        if not self.config.HOME_DATA_API_URL or not self.config.BEARER_TOKEN:
+            logger.critical("HOME_DATA_API_URL and BEARER_TOKEN must be set")
+            return None
 
-        logger.critical("Failed to fetch home data after maximum retries")
-        return None
\ No newline at end of file
+        return self._post(
+            'home_data',
+            self.config.HOME_DATA_API_URL,
+            HOME_DATA_TIMEOUT,
+            retries,
+            backoff_factor,
+            self.config.HOME_DATA_REFRESH_SECONDS * RETRY_BUDGET_FRACTION,
+        )
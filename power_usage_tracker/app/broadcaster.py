@@ -0,0 +1,76 @@
+import json
+import queue
+import threading
+import logging
+
+logger = logging.getLogger(__name__)
+
+SUBSCRIBER_QUEUE_SIZE = 32
+HEARTBEAT_SECONDS = 15
+
+
+def format_sse(event, payload):
+    """Encode one Server-Sent Events message."""
+    return f"event: {event}\ndata: {json.dumps(payload, separators=(',', ':'))}\n\n"
+
+
+class Broadcaster:
+    """Fan-out of live updates to every connected Server-Sent Events client.
+
+    Each message is serialized once in ``publish`` and the encoded string is
+    handed to every subscriber queue, so the cost of a new reading does not
+    depend on how it is rendered per client. Slow clients lose their oldest
+    queued message rather than blocking ingestion.
+    """
+
+    def __init__(self, queue_size=SUBSCRIBER_QUEUE_SIZE):
+        self.queue_size = queue_size
+        self._subscribers = set()
+        self._lock = threading.Lock()
+
+    def subscriber_count(self):
+        with self._lock:
+            return len(self._subscribers)
+
+    def subscribe(self):
+        subscriber = queue.Queue(maxsize=self.queue_size)
+        with self._lock:
+            self._subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        with self._lock:
+            self._subscribers.discard(subscriber)
+
+    def publish(self, event, payload):
+        message = format_sse(event, payload)
+        with self._lock:
+            subscribers = list(self._subscribers)
+
+        for subscriber in subscribers:
+            try:
+                subscriber.put_nowait(message)
+            except queue.Full:
+                try:
+                    subscriber.get_nowait()
+                except queue.Empty:
+                    pass
+                try:
+                    subscriber.put_nowait(message)
+                except queue.Full:
+                    logger.debug("Dropping live update for a slow stream client")
+
+    def stream(self, initial_messages=(), heartbeat_seconds=HEARTBEAT_SECONDS):
+        """Yield encoded messages for one client until it disconnects."""
+        subscriber = self.subscribe()
+        try:
+            for message in initial_messages:
+                yield message
+            while True:
+                try:
+                    yield subscriber.get(timeout=heartbeat_seconds)
+                except queue.Empty:
+                    # Comment lines keep proxies from closing idle streams.
+                    yield ": keepalive\n\n"
+        finally:
+            self.unsubscribe(subscriber)
@@ -0,0 +1,145 @@
+import logging
+import sqlite3
+import time
+from datetime import datetime
+
+from .config import DEFAULT_METER_ID
+from .db import read_connection, write_connection
+from .rollups import mark_history_rewritten
+
+logger = logging.getLogger(__name__)
+
+# Seconds of history folded per write transaction; at a 30 s feed this is
+# about 720 rows, short enough that store_data never waits noticeably.
+COMPACTION_BATCH_SECONDS = 6 * 3600
+# Free pages returned to the filesystem per run once rows are compacted.
+INCREMENTAL_VACUUM_PAGES = 2000
+
+
+def watermark_key(meter_id=DEFAULT_METER_ID):
+    return f'compacted_before:{meter_id}'
+
+
+def get_watermark(conn, meter_id):
+    row = conn.execute('SELECT value FROM app_metadata WHERE key = ?', (watermark_key(meter_id),)).fetchone()
+    return int(row[0]) if row else None
+
+
+def _compact_window(conn, start_epoch, end_epoch, meter_id):
+    """Replace each minute's raw rows in ``[start, end)`` with one summary row.
+
+    The summary keeps the minute's last balance, mean load and the sums of
+    ``amount_used``/``recharge_amount``, so the totals behind the rollup
+    tables are unchanged. Minutes holding a single row are left alone.
+    """
+    rows = conn.execute('''
+        SELECT id, ts_epoch, balance, present_load, amount_used, recharge_amount, samples
+        FROM power_usage
+        WHERE meter_id = ? AND ts_epoch >= ? AND ts_epoch < ?
+        ORDER BY ts_epoch, id
+    ''', (meter_id, start_epoch, end_epoch)).fetchall()
+
+    minutes = {}
+    for row in rows:
+        minutes.setdefault(row[1] // 60 * 60, []).append(row)
+
+    removed = 0
+    for minute, group in minutes.items():
+        if len(group) < 2:
+            continue
+        samples = sum(row[6] or 1 for row in group)
+        conn.execute(
+            'DELETE FROM power_usage WHERE id IN ({})'.format(', '.join('?' for _ in group)),
+            [row[0] for row in group]
+        )
+        conn.execute('''
+            INSERT INTO power_usage
+                (meter_id, timestamp, ts_epoch, balance, present_load, amount_used, recharge_amount, samples)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        ''', (
+            meter_id,
+            datetime.utcfromtimestamp(minute),
+            minute,
+            group[-1][2],
+            sum(row[3] * (row[6] or 1) for row in group) / samples,
+            sum(row[4] or 0 for row in group),
+            sum(row[5] or 0 for row in group),
+            samples
+        ))
+        removed += len(group) - 1
+    return removed
+
+
+def compact_raw_readings(database_path, retention_days, now=None):
+    """Downsample raw readings older than ``retention_days`` to one per minute.
+
+    Each meter resumes from its own watermark stored in ``app_metadata`` and
+    proceeds in ``COMPACTION_BATCH_SECONDS`` windows, each in its own
+    transaction. Returns the number of rows removed.
+    """
+    if retention_days <= 0:
+        return 0
+
+    started = time.perf_counter()
+    now = time.time() if now is None else now
+    cutoff = int(now - retention_days * 86400) // 60 * 60
+
+    removed = 0
+    try:
+        with read_connection(database_path) as conn:
+            # The daily rollup is tiny and lists every meter with readings.
+            meter_ids = [row[0] for row in conn.execute('SELECT DISTINCT meter_id FROM power_usage_daily')]
+        for meter_id in meter_ids:
+            removed += _compact_meter(database_path, meter_id, cutoff)
+    except sqlite3.Error as e:
+        logger.error(f"Database error compacting readings: {e}")
+
+    if removed:
+        logger.info(
+            f"Compacted {removed} raw readings older than {retention_days} days "
+            f"in {time.perf_counter() - started:.1f}s"
+        )
+        reclaim_free_pages(database_path)
+    return removed
+
+
+def _compact_meter(database_path, meter_id, cutoff):
+    with read_connection(database_path) as conn:
+        start = get_watermark(conn, meter_id)
+        if start is None:
+            start = conn.execute(
+                'SELECT MIN(ts_epoch) FROM power_usage WHERE meter_id = ?', (meter_id,)
+            ).fetchone()[0]
+    if start is None or start >= cutoff:
+        return 0
+    start = start // 60 * 60
+
+    removed = 0
+    while start < cutoff:
+        end = min(start + COMPACTION_BATCH_SECONDS, cutoff)
+        with write_connection(database_path) as conn:
+            window_removed = _compact_window(conn, start, end, meter_id)
+            if window_removed:
+                mark_history_rewritten(conn, meter_id)
+            removed += window_removed
+            conn.execute(
+                'INSERT OR REPLACE INTO app_metadata (key, value) VALUES (?, ?)',
+                (watermark_key(meter_id), str(end))
+            )
+        start = end
+    return removed
+
+
+def reclaim_free_pages(database_path, max_pages=INCREMENTAL_VACUUM_PAGES):
+    """Run a bounded ``incremental_vacuum`` when auto_vacuum is incremental."""
+    try:
+        with write_connection(database_path) as conn:
+            if conn.execute('PRAGMA auto_vacuum').fetchone()[0] != 2:
+                return
+            free_pages = conn.execute('PRAGMA freelist_count').fetchone()[0]
+            # The pragma frees one page per step; execute() steps only once,
+            # while executescript() runs it to completion.
+            conn.executescript(f'PRAGMA incremental_vacuum({int(max_pages)});')
+        logger.debug(f"Incremental vacuum released up to {min(free_pages, max_pages)} of {free_pages} free pages")
+    except sqlite3.Error as e:
+        logger.error(f"Database error during incremental vacuum: {e}")
@@ -1,23 +1,111 @@
+import json
 import os
 import sys
 
+DEFAULT_METER_ID = 'default'
+
+# Per-meter keys accepted in the meters file, mapped to Config attributes.
+METER_SETTINGS = {
+    'live_updates_api_url': 'LIVE_UPDATES_API_URL',
+    'home_data_api_url': 'HOME_DATA_API_URL',
+    'bearer_token': 'BEARER_TOKEN',
+    'input_type': 'INPUT_TYPE',
+    'low_balance_threshold': 'LOW_BALANCE_THRESHOLD',
+}
+
+
+class MeterConfig:
+    """Settings for one meter.
+
+    Anything the meter does not override is read from the process-wide
+    ``Config``, so a ``MeterConfig`` can be passed wherever ``store_data`` and
+    ``ApiClient`` expect a config.
+    """
+
+    def __init__(self, config, meter_id, name=None, alert_prefix='', **overrides):
+        self._config = config
+        self.METER_ID = meter_id
+        self.METER_NAME = name or meter_id
+        self.ALERT_PREFIX = alert_prefix
+        for key, value in overrides.items():
+            setattr(self, METER_SETTINGS[key], value)
+
+    def __getattr__(self, name):
+        return getattr(self._config, name)
+
+
 class Config:
     def __init__(self):
         self.LIVE_UPDATES_API_URL = os.environ.get('LIVE_UPDATES_API_URL')
         self.HOME_DATA_API_URL = os.environ.get('HOME_DATA_API_URL')
         self.LOW_BALANCE_THRESHOLD = os.environ.get('LOW_BALANCE_THRESHOLD')
         self.BEARER_TOKEN = os.environ.get('POWER_USAGE_BEARER_TOKEN')
+        self.INPUT_TYPE = os.environ.get('POWER_USAGE_INPUT_TYPE')
         self.DATABASE = os.environ.get('POWER_USAGE_DATABASE', 'power_usage_index.db')
         self.FETCH_INTERVAL_SECONDS = int(os.environ.get('POWER_USAGE_FETCH_INTERVAL_SECONDS', 30))
+        self.HOME_DATA_REFRESH_SECONDS = int(os.environ.get('POWER_USAGE_HOME_DATA_REFRESH_SECONDS', 300))
+        self.SPIKE_WINDOW_HOURS = float(os.environ.get('POWER_USAGE_SPIKE_WINDOW_HOURS', 1))
+        self.RAW_RETENTION_DAYS = int(os.environ.get('POWER_USAGE_RAW_RETENTION_DAYS', 90))
+        self.WRITE_BEHIND_ROWS = int(os.environ.get('POWER_USAGE_WRITE_BEHIND_ROWS', 0))
+        self.WRITE_BEHIND_SECONDS = int(os.environ.get('POWER_USAGE_WRITE_BEHIND_SECONDS', 60))
+        self.METERS_FILE = os.environ.get('POWER_USAGE_METERS_FILE')
         self.TELEGRAM_BOT_TOKEN = os.environ.get('TELEGRAM_BOT_TOKEN')
         self.TELEGRAM_CHAT_ID = os.environ.get('TELEGRAM_CHAT_ID')
 
-        if not all([self.LIVE_UPDATES_API_URL, self.HOME_DATA_API_URL, self.BEARER_TOKEN, self.LOW_BALANCE_THRESHOLD]):
-            print(
-                "Error: LIVE_UPDATES_API_URL, HOME_DATA_API_URL, LOW_BALANCE_THRESHOLD, and POWER_USAGE_BEARER_TOKEN must be set.",
-                file=sys.stderr
-            )
+        self.METERS = self._load_meters()
+
+        for meter in self.METERS:
+            if not all([meter.LIVE_UPDATES_API_URL, meter.HOME_DATA_API_URL, meter.BEARER_TOKEN, meter.LOW_BALANCE_THRESHOLD]):
+                print(
+                    "Error: LIVE_UPDATES_API_URL, HOME_DATA_API_URL, LOW_BALANCE_THRESHOLD, and POWER_USAGE_BEARER_TOKEN must be set"
+                    + (f" (or given for meter '{meter.METER_ID}' in {self.METERS_FILE})." if self.METERS_FILE else "."),
+                    file=sys.stderr
+                )
+                sys.exit(1)
+
+    def _load_meters(self):
+        """Build the meter registry from ``POWER_USAGE_METERS_FILE``.
+
+        The file is a JSON list of objects with an ``id``, an optional
+        ``name`` and any of the keys in ``METER_SETTINGS``. Without a file the
+        tracker polls a single meter configured by the environment.
+        """
+        if not self.METERS_FILE:
+            return [MeterConfig(self, DEFAULT_METER_ID)]
+
+        try:
+            with open(self.METERS_FILE) as f:
+                entries = json.load(f)
+            meters = []
+            for entry in entries:
+                entry = dict(entry)
+                meter_id = str(entry.pop('id'))
+                name = entry.pop('name', None)
+                unknown = set(entry) - set(METER_SETTINGS)
+                if unknown:
+                    raise ValueError(f"unknown settings for meter '{meter_id}': {', '.join(sorted(unknown))}")
+                meters.append((meter_id, name, entry))
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            print(f"Error: could not load meters from {self.METERS_FILE}: {e}", file=sys.stderr)
             sys.exit(1)
 
+        meter_ids = [meter_id for meter_id, _, _ in meters]
+        if not meters or len(set(meter_ids)) != len(meter_ids):
+            print(f"Error: {self.METERS_FILE} must list at least one meter, with unique ids.", file=sys.stderr)
+            sys.exit(1)
+
+        # Meters share one Telegram chat, so alerts name the meter once there are several.
+        multiple = len(meters) > 1
+        return [
+            MeterConfig(
+                self,
+                meter_id,
+                name,
+                alert_prefix=f"[{name or meter_id}] " if multiple else '',
+                **overrides
+            )
+            for meter_id, name, overrides in meters
+        ]
+
 def load_config():
     return Config()
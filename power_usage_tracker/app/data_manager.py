@@ -1,70 +1,287 @@
+import json
 import sqlite3
 from datetime import datetime, timedelta
 import pytz
 import logging
-import statistics
-from .telegram_notifier import send_telegram_message
+import time
+from .config import DEFAULT_METER_ID
+from .db import read_connection, write_connection
+from .metrics import ALERTS_RAISED, ANOMALIES_DETECTED, READINGS_SKIPPED, STORE_DATA_SECONDS
+from .migrations import run_migrations
+from .queries import DATA_VERSION_SQL, LAST_RECORD_SQL, RECENT_LOADS_SQL, RECENT_READINGS_SQL
+from .query_plans import check_query_plans
+from .rollups import init_rollup_tables, backfill_rollups, apply_reading, to_epoch
+from .telegram_notifier import enqueue_telegram_message, init_outbox_table
 
 logger = logging.getLogger(__name__)
 
+# Assuming usage in a 30-sec interval won't exceed Rs. 50
+MAX_USAGE_PER_READING = 50
+# Readings whose UpdatedOn is older than this are skipped as stale.
+MAX_READING_AGE_SECONDS = 300
+
+def state_snapshot_key(meter_id):
+    """``app_metadata`` key holding a meter's persisted ``State`` snapshot."""
+    return f'state:{meter_id}'
+
 def init_db(database_path):
     """Initialize database with proper indexing"""
     try:
-        conn = sqlite3.connect(database_path)
-        c = conn.cursor()
-        
-        c.execute('''
-            CREATE TABLE IF NOT EXISTS power_usage (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                timestamp DATETIME NOT NULL,
-                balance REAL NOT NULL,
-                present_load REAL NOT NULL,
-                amount_used REAL,
-                recharge_amount REAL DEFAULT 0
-            )
-        ''')
-        
-        c.execute('CREATE INDEX IF NOT EXISTS timestamp_idx ON power_usage(timestamp)')
-        c.execute('CREATE INDEX IF NOT EXISTS recharge_amount_idx ON power_usage(recharge_amount)')
-        conn.commit()
+        with write_connection(database_path) as conn:
+            # Baseline schema; later changes are applied by run_migrations.
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS power_usage (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    timestamp DATETIME NOT NULL,
+                    balance REAL NOT NULL,
+                    present_load REAL NOT NULL,
+                    amount_used REAL,
+                    recharge_amount REAL DEFAULT 0
+                )
+            ''')
+
+        run_migrations(database_path)
+
+        with write_connection(database_path) as conn:
+            c = conn.cursor()
+            init_rollup_tables(c)
+            backfill_rollups(c)
+            init_outbox_table(c)
+
+        check_query_plans(database_path)
     except sqlite3.Error as e:
         logger.error(f"Database initialization error: {e}")
-    finally:
-        if conn:
-            conn.close()
 
-def get_last_record(database_path):
-    """Retrieve last record with proper connection handling"""
-    conn = None
+def get_last_record(database_path, meter_id=DEFAULT_METER_ID):
+    """Retrieve last record using a pooled read-only connection"""
     try:
-        conn = sqlite3.connect(database_path)
-        c = conn.cursor()
-        
-        c.execute('SELECT * FROM power_usage ORDER BY timestamp DESC LIMIT 1')
-        record = c.fetchone()
-        
+        with read_connection(database_path) as conn:
+            c = conn.cursor()
+            c.execute(LAST_RECORD_SQL, (meter_id,))
+            record = c.fetchone()
+
         if record:
-            # Handle both old records (4 columns) and new records (5 columns)
             return {
-                'timestamp': record[1],
-                'balance': record[2],
-                'present_load': record[3],
-                'amount_used': record[4],
-                'recharge_amount': record[5] if len(record) > 5 else 0
+                'timestamp': record[0],
+                'balance': record[1],
+                'present_load': record[2],
+                'amount_used': record[3],
+                'recharge_amount': record[4] or 0
             }
     except sqlite3.Error as e:
         logger.error(f"Database error: {e}")
-    finally:
-        if conn:
-            conn.close()
     return None
 
-def store_data(data, state, config):
-    """Store API data with proper error handling and meter reset detection"""
+def load_recent_readings(database_path, readings, meter_id=DEFAULT_METER_ID):
+    """Fill the in-memory ring buffer with the newest stored readings."""
+    try:
+        with read_connection(database_path) as conn:
+            c = conn.cursor()
+            c.execute(RECENT_READINGS_SQL, (meter_id, readings.capacity))
+            records = c.fetchall()
+    except sqlite3.Error as e:
+        logger.error(f"Database error loading recent readings: {e}")
+        return
+
+    for timestamp_epoch, present_load, balance in reversed(records):
+        readings.append(timestamp_epoch, float(present_load), float(balance))
+
+def warm_up_detectors(state, database_path, meter_id=DEFAULT_METER_ID):
+    """Refill ``state``'s anomaly detectors with the readings in their window.
+
+    The ring buffer is used when it reaches back over the whole load window;
+    longer windows are read from the database, one indexed range bounded by
+    the window's length.
+    """
+    latest = state.recent_readings.latest()
+    loads = None
+    window_seconds = state.detectors.load_spike.window.window_seconds
+    if latest:
+        start_epoch = latest[0] - window_seconds
+        loads = state.recent_readings.since(start_epoch)
+        if len(loads) >= state.recent_readings.capacity:
+            try:
+                with read_connection(database_path) as conn:
+                    loads = conn.execute(
+                        RECENT_LOADS_SQL, (meter_id, start_epoch, int(window_seconds) + 1)
+                    ).fetchall()
+            except sqlite3.Error as e:
+                logger.error(f"Database error loading the detector window: {e}")
+    state.detectors.warm_up(state, loads)
+
+def build_live_update(state):
+    """Compact live payload pushed to stream clients for the newest reading."""
+    latest = state.recent_readings.latest()
+    if not latest:
+        return None
+
+    timestamp_epoch, present_load, balance = latest
+    return {
+        'timestamp': datetime.fromtimestamp(timestamp_epoch, pytz.utc).isoformat(),
+        'present_load_kw': present_load,
+        'balance': balance,
+        'is_dg_on': state.is_dg_on,
+        'dg_since': state.dg_state_changed_at.timestamp() if state.dg_state_changed_at else None,
+    }
+
+def get_data_version(database_path):
+    """Return the newest ``power_usage`` row id, or ``None`` on a database error.
+
+    Ids are ``AUTOINCREMENT`` and never reused, and every write to stored
+    history (ingestion, imports, compaction) inserts a row, so the value
+    grows with any change. It is read from the database, so every worker
+    process agrees on it.
+    """
+    try:
+        with read_connection(database_path) as conn:
+            return conn.execute(DATA_VERSION_SQL).fetchone()[0] or 0
+    except sqlite3.Error as e:
+        logger.error(f"Database error reading data version: {e}")
+        return None
+
+def mark_data_changed(state):
+    """Record when ``state``'s meter last changed and push the latest reading."""
+    state.data_updated_at = time.time()
+    state.live_updates.publish('reading', build_live_update(state))
+
+def load_state_snapshot(database_path, meter_id=DEFAULT_METER_ID):
+    """Return the snapshot ``store_data`` last saved for ``meter_id``, or ``None``."""
+    try:
+        with read_connection(database_path) as conn:
+            row = conn.execute(
+                'SELECT value FROM app_metadata WHERE key = ?', (state_snapshot_key(meter_id),)
+            ).fetchone()
+    except sqlite3.Error as e:
+        logger.error(f"Database error loading state snapshot: {e}")
+        return None
+
+    if not row:
+        return None
+    try:
+        return json.loads(row[0])
+    except ValueError as e:
+        logger.error(f"Ignoring unreadable state snapshot for meter {meter_id}: {e}")
+        return None
+
+def warm_start_state(state, database_path, meter_id=DEFAULT_METER_ID):
+    """Load the in-memory ingestion state from the database once at startup.
+
+    Every read is bounded: the newest row, one ring buffer of recent readings
+    (plus the anomaly detectors' window when it is longer), and the state
+    snapshot, all by primary key or index. Boot time therefore
+    does not grow with the size of the history.
+    """
+    started = time.perf_counter()
+    state.last_record = get_last_record(database_path, meter_id)
+    load_recent_readings(database_path, state.recent_readings, meter_id)
+
+    snapshot = load_state_snapshot(database_path, meter_id)
+    if snapshot:
+        state.restore(snapshot)
+    elif state.last_record:
+        # No snapshot yet (first start after upgrading): seed what the stored
+        # readings can tell us; the first tick fills in the rest.
+        state.last_balance_value = state.last_record['balance']
+    warm_up_detectors(state, database_path, meter_id)
+
+    logger.info(
+        f"Warm start for meter {meter_id} took {(time.perf_counter() - started) * 1000:.1f} ms"
+        + (" (restored state snapshot)" if snapshot else "")
+    )
+
+def follow_stored_readings(state, database_path, meter_id=DEFAULT_METER_ID):
+    """Apply readings stored by another process since ``state`` last saw one.
+
+    Worker processes that do not run the ingestion jobs call this on a short
+    interval so their live endpoints, SSE clients and response caches follow
+    the leader's writes.
+    """
+    latest = state.recent_readings.latest()
+    try:
+        with read_connection(database_path) as conn:
+            records = conn.execute(
+                '''
+                SELECT timestamp, ts_epoch, balance, present_load, amount_used, recharge_amount
+                FROM power_usage
+                WHERE meter_id = ? AND ts_epoch > ?
+                ORDER BY ts_epoch
+                LIMIT ?
+                ''',
+                (meter_id, latest[0] if latest else -1, state.recent_readings.capacity)
+            ).fetchall()
+    except sqlite3.Error as e:
+        logger.error(f"Database error following stored readings: {e}")
+        return
+
+    if not records:
+        return
+
+    for _, timestamp_epoch, balance, present_load, _, _ in records:
+        state.recent_readings.append(timestamp_epoch, float(present_load), float(balance))
+
+    timestamp, _, balance, present_load, amount_used, recharge_amount = records[-1]
+    state.last_record = {
+        'timestamp': timestamp,
+        'balance': balance,
+        'present_load': present_load,
+        'amount_used': amount_used,
+        'recharge_amount': recharge_amount or 0
+    }
+    # The leader saves its detection state with every row it stores, which
+    # keeps DG status current here and lets this worker take over mid-session.
+    snapshot = load_state_snapshot(database_path, meter_id)
+    if snapshot:
+        state.restore(snapshot)
+    mark_data_changed(state)
+
+def _report_anomaly(config, detector, message):
+    if message:
+        logger.warning(f"{config.ALERT_PREFIX}{message}")
+        ANOMALIES_DETECTED.labels(config.METER_ID, detector.name).inc()
+
+def balance_delta(previous_balance, balance):
+    """Split a balance change into ``(amount_used, recharge_amount)``.
+
+    A drop is usage and a rise is a recharge. Drops of ``MAX_USAGE_PER_READING``
+    or more are treated as meter resets and count as neither.
+    """
+    balance_change = previous_balance - balance
+    if 0 < balance_change < MAX_USAGE_PER_READING:
+        return balance_change, 0
+    if balance_change < 0:
+        return 0, abs(balance_change)
+    return 0, 0
+
+def save_state_snapshot(state, config, snapshot, write_buffer=None):
+    """Persist ``snapshot``, through ``write_buffer`` when one is in use."""
+    if write_buffer is not None:
+        if write_buffer.add_snapshot(state_snapshot_key(config.METER_ID), snapshot):
+            write_buffer.flush()
+    else:
+        with write_connection(config.DATABASE) as conn:
+            conn.execute(
+                '''
+                INSERT INTO app_metadata (key, value) VALUES (?, ?)
+                ON CONFLICT(key) DO UPDATE SET value = excluded.value
+                ''',
+                (state_snapshot_key(config.METER_ID), snapshot)
+            )
+    state.saved_snapshot = snapshot
+
+def store_data(data, state, config, write_buffer=None):
+    """Store API data with proper error handling and meter reset detection.
+
+    The previous stored row is read from ``state.last_record`` rather than the
+    database, so a tick performs at most one write transaction: the reading,
+    its rollups and any alerts it raised are committed together. ``config``
+    is the ``MeterConfig`` of the meter the reading came from.
+
+    With a ``WriteBehindBuffer``, readings that raise no alerts are queued
+    there and committed in batches instead.
+    """
+    started = time.perf_counter()
+    alerts = []
     try:
-        conn = sqlite3.connect(config.DATABASE)
-        c = conn.cursor()
-        
         try:
             balance = float(data['Data']['Balance'])
             present_load = float(data['Data']['PresentLoad'])
@@ -73,6 +290,7 @@ def store_data(data, state, config):
             timestamp = datetime.strptime(data['Data']['UpdatedOn'], '%d-%m-%Y %H:%M:%S')
         except (KeyError, ValueError, TypeError) as e:
             logger.error(f"Data validation error: {e}")
+            READINGS_SKIPPED.labels(config.METER_ID, 'invalid').inc()
             return
 
         # === START: Data Validation and Anomaly Checks ===
@@ -81,14 +299,20 @@ def store_data(data, state, config):
         kolkata_tz = pytz.timezone('Asia/Kolkata')
         now_kolkata = datetime.now(kolkata_tz)
         timestamp_kolkata = kolkata_tz.localize(timestamp)
+        detectors = state.detectors
+
+        stale_feed = detectors.stale_feed
+        _report_anomaly(config, stale_feed, stale_feed.update(time.time(), timestamp_kolkata.timestamp()))
 
-        if (now_kolkata - timestamp_kolkata) > timedelta(minutes=5):
+        if (now_kolkata - timestamp_kolkata) > timedelta(seconds=MAX_READING_AGE_SECONDS):
             logger.warning(f"Stale data from API. Timestamp is older than 5 minutes: {timestamp_kolkata}. Skipping.")
+            READINGS_SKIPPED.labels(config.METER_ID, 'stale').inc()
             return
 
         # 2. Check for anomalous zero-value data
         if balance == 0 and eb_value == 0 and dg_value == 0:
             logger.warning(f"Received anomalous zero-value data for timestamp {timestamp}. Skipping storage.")
+            READINGS_SKIPPED.labels(config.METER_ID, 'anomalous').inc()
             return
 
         # === END: Data Validation and Anomaly Checks ===
@@ -97,7 +321,7 @@ def store_data(data, state, config):
         if config.LOW_BALANCE_THRESHOLD and balance < float(config.LOW_BALANCE_THRESHOLD):
             today = datetime.now().date()
             if state.last_low_balance_alert_date != today:
-                send_telegram_message(f"Low balance alert: Your meter balance is ₹{balance:.2f}.", config)
+                alerts.append(f"Low balance alert: Your meter balance is ₹{balance:.2f}.")
                 state.last_low_balance_alert_date = today
         
         # DG Alert and Data Inconsistency Logic
@@ -110,25 +334,18 @@ def store_data(data, state, config):
             logger.info(f"EB Check: eb_value={eb_value}, last_eb_value={state.last_eb_value}, is_eb_changed={is_eb_changed}")
             logger.info(f"Balance Check: balance={balance}, last_balance_value={state.last_balance_value}, is_balance_changed={is_balance_changed}")
 
-            # 3. Detect Inconsistent API Data (Balance changes but consumption doesn't)
-            if is_balance_changed and not is_eb_changed and not is_dg_changed:
-                logger.warning(f"Data inconsistency detected: Balance changed from {state.last_balance_value} to {balance}, but EB and DG readings are static.")
+            # 3. Detect Inconsistent API Data (Balance changes consumption doesn't explain)
+            source_epoch = timestamp_kolkata.timestamp()
+            consistency = detectors.consistency
+            _report_anomaly(config, consistency, consistency.update(source_epoch, balance, eb_value, dg_value))
 
             # 4. Detect PresentLoad Spikes
-            if len(state.recent_loads) > 5:  # Ensure we have enough data for a stable average
-                average_load = statistics.mean(state.recent_loads)
-                # A spike is an unusually high value compared to the recent average
-                if present_load > (average_load * 3) and present_load > 2.0:
-                    logger.warning(f"Anomalous spike in PresentLoad detected: {present_load:.2f} (recent average was {average_load:.2f})")
-            
-            # Maintain a rolling list of the last 10 load readings
-            state.recent_loads.append(present_load)
-            if len(state.recent_loads) > 10:
-                state.recent_loads.pop(0)
+            load_spike = detectors.load_spike
+            _report_anomaly(config, load_spike, load_spike.update(source_epoch, present_load))
 
             # Condition to detect switch TO DG:
             if not state.is_dg_on and is_dg_changed and is_balance_changed and not is_eb_changed:
-                send_telegram_message(f"Power is now on DG. Current Balance: ₹{balance:.2f}", config)
+                alerts.append(f"Power is now on DG. Current Balance: ₹{balance:.2f}")
                 state.is_dg_on = True
                 state.dg_state_changed_at = datetime.now()
                 state.dg_session_start_value = state.last_dg_value
@@ -155,51 +372,102 @@ def store_data(data, state, config):
                     f"- Avg. Power: {avg_power:.2f} W\n\n"
                     f"Current Balance: ₹{balance:.2f}"
                 )
-                send_telegram_message(summary_message, config)
+                alerts.append(summary_message)
                 
                 state.is_dg_on = False
                 state.dg_state_changed_at = datetime.now()
                 state.dg_session_start_value = None
         
+        eb_used = eb_value - state.last_eb_value if state.last_eb_value is not None else 0
+        dg_used = dg_value - state.last_dg_value if state.last_dg_value is not None else 0
+
         # Update state for next iteration
         state.last_dg_value = dg_value
         state.last_eb_value = eb_value
         state.last_balance_value = balance
         state.last_updated_timestamp = timestamp
 
-        last_record = get_last_record(config.DATABASE)
-        
+        last_record = state.last_record
+
         amount_used = 0
         recharge_amount = 0
-        
+
         if last_record:
-            previous_balance = last_record['balance']
-            balance_change = previous_balance - balance
-            
-            if 0 < balance_change < 50: # Assuming usage in a 30-sec interval won't exceed Rs. 50
-                amount_used = balance_change
-            elif balance_change < 0:
-                recharge_amount = abs(balance_change)
-                send_telegram_message(f"Meter recharged: ₹{recharge_amount:.2f} added. Current balance: ₹{balance:.2f}", config)
+            amount_used, recharge_amount = balance_delta(last_record['balance'], balance)
+            if recharge_amount:
+                alerts.append(f"Meter recharged: ₹{recharge_amount:.2f} added. Current balance: ₹{balance:.2f}")
+            state.forecast.update(timestamp_kolkata.timestamp(), amount_used, eb_used, dg_used)
         
-        if not last_record or last_record['balance'] != balance:
-            timestamp_utc = pytz.timezone('Asia/Kolkata').localize(timestamp).astimezone(pytz.utc)
-            c.execute('''
-                INSERT INTO power_usage (timestamp, balance, present_load, amount_used, recharge_amount)
-                VALUES (?, ?, ?, ?, ?)
-            ''', (
-                timestamp_utc.replace(tzinfo=None),
-                balance,
-                present_load,
-                amount_used,
-                recharge_amount
-            ))
-        
-        conn.commit()
+        should_insert = not last_record or last_record['balance'] != balance
+        snapshot = json.dumps(state.snapshot())
+        if not should_insert and not alerts:
+            # Nothing to store, but DG tracking and the forecast may still
+            # have moved on; a restart must not restore older state.
+            if snapshot != state.saved_snapshot:
+                save_state_snapshot(state, config, snapshot, write_buffer)
+            return
+
+        timestamp_utc = pytz.timezone('Asia/Kolkata').localize(timestamp).astimezone(pytz.utc)
+        timestamp_epoch = to_epoch(timestamp_utc)
+        row = (
+            config.METER_ID,
+            timestamp_utc.replace(tzinfo=None),
+            timestamp_epoch,
+            balance,
+            present_load,
+            amount_used,
+            recharge_amount
+        )
+
+        if write_buffer is not None and not alerts:
+            # Only new rows get this far without alerts.
+            if write_buffer.add(row, state_snapshot_key(config.METER_ID), snapshot):
+                write_buffer.flush()
+        else:
+            if write_buffer is not None:
+                # Alerts are never delayed; pending readings are written first.
+                write_buffer.flush()
+
+            with write_connection(config.DATABASE) as conn:
+                if should_insert:
+                    c = conn.cursor()
+                    c.execute('''
+                        INSERT INTO power_usage (meter_id, timestamp, ts_epoch, balance, present_load, amount_used, recharge_amount)
+                        VALUES (?, ?, ?, ?, ?, ?, ?)
+                    ''', row)
+                    apply_reading(c, timestamp_epoch, amount_used, recharge_amount, config.METER_ID)
+
+                for message in alerts:
+                    enqueue_telegram_message(config.ALERT_PREFIX + message, config)
+
+                # Piggybacks on this transaction, so persisting the state costs
+                # no extra commit. DG switches and alerts always reach here.
+                conn.execute(
+                    '''
+                    INSERT INTO app_metadata (key, value) VALUES (?, ?)
+                    ON CONFLICT(key) DO UPDATE SET value = excluded.value
+                    ''',
+                    (state_snapshot_key(config.METER_ID), snapshot)
+                )
+        state.saved_snapshot = snapshot
+        if alerts:
+            ALERTS_RAISED.labels(config.METER_ID).inc(len(alerts))
+
+        if should_insert:
+            state.last_record = {
+                'timestamp': timestamp_utc.replace(tzinfo=None).isoformat(' '),
+                'balance': balance,
+                'present_load': present_load,
+                'amount_used': amount_used,
+                'recharge_amount': recharge_amount
+            }
+            state.recent_readings.append(timestamp_epoch, present_load, balance)
+            mark_data_changed(state)
     except sqlite3.Error as e:
         logger.error(f"Database error: {e}")
     except Exception as e:
         logger.error(f"Unexpected error: {e}")
     finally:
-        if conn:
-            conn.close()
\ No newline at end of file
+        elapsed = time.perf_counter() - started
+        STORE_DATA_SECONDS.labels(config.METER_ID).observe(elapsed)
+        logger.debug(f"store_data took {elapsed * 1000:.2f} ms")
\ No newline at end of file
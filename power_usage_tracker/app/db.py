@@ -0,0 +1,190 @@
+import sqlite3
+import threading
+import queue
+import logging
+from contextlib import contextmanager
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+# Pragmas applied to every pooled connection. WAL lets dashboard readers run
+# alongside the scheduler's writes; NORMAL sync is durable across app crashes
+# in WAL mode and avoids an fsync per commit.
+CONNECTION_PRAGMAS = (
+    "PRAGMA synchronous = NORMAL",
+    "PRAGMA busy_timeout = 5000",
+    "PRAGMA cache_size = -8000",
+    "PRAGMA mmap_size = 67108864",
+    "PRAGMA temp_store = MEMORY",
+)
+
+READ_POOL_SIZE = 8
+# How long a reader waits for a pooled connection before giving up, so a few
+# long-running readers cannot stall every dashboard request indefinitely.
+READ_CHECKOUT_TIMEOUT_SECONDS = 10
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def connect(database_path, readonly=False):
+    """Open a new connection with ``CONNECTION_PRAGMAS`` applied."""
+    if readonly:
+        uri = Path(database_path).resolve().as_uri() + "?mode=ro"
+        conn = sqlite3.connect(uri, uri=True, check_same_thread=False)
+    else:
+        conn = sqlite3.connect(database_path, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode = WAL")
+
+    for pragma in CONNECTION_PRAGMAS:
+        conn.execute(pragma)
+    return conn
+
+
+class ConnectionPool:
+    """Bounded pool of long-lived SQLite connections for one database file.
+
+    Connections are handed to one thread at a time, so they can be created
+    with ``check_same_thread=False`` and reused by Flask's per-request threads
+    and APScheduler workers alike. Read-only pools open the database with
+    ``mode=ro`` so dashboard queries can never take a write lock.
+    """
+
+    def __init__(self, database_path, readonly=False, size=READ_POOL_SIZE):
+        self.database_path = database_path
+        self.readonly = readonly
+        self.size = size
+        self._idle = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def _checkout(self):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+
+        with self._lock:
+            if self._created < self.size:
+                self._created += 1
+                try:
+                    return connect(self.database_path, self.readonly)
+                except sqlite3.Error:
+                    self._created -= 1
+                    raise
+
+        # Writers queue for as long as it takes: dropping a reading is worse
+        # than a slow one.
+        timeout = READ_CHECKOUT_TIMEOUT_SECONDS if self.readonly else None
+        try:
+            return self._idle.get(timeout=timeout)
+        except queue.Empty:
+            raise sqlite3.OperationalError(
+                f"no pooled connection to {self.database_path} became free within {timeout}s"
+            ) from None
+
+    def _checkin(self, conn):
+        self._idle.put(conn)
+
+    @contextmanager
+    def connection(self):
+        """Check out a connection for the calling thread.
+
+        Nested checkouts on the same thread reuse the outer connection, so a
+        helper called from inside a write transaction joins that transaction
+        instead of deadlocking on the single writer connection.
+        """
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            self._local.depth += 1
+            try:
+                yield conn
+            finally:
+                self._local.depth -= 1
+            return
+
+        conn = self._checkout()
+        self._local.conn = conn
+        self._local.depth = 0
+        try:
+            yield conn
+        finally:
+            self._local.conn = None
+            self._checkin(conn)
+
+    def is_nested(self):
+        return getattr(self._local, "depth", 0) > 0
+
+    def close(self):
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            conn.close()
+            with self._lock:
+                self._created -= 1
+
+
+def get_pool(database_path, readonly=False):
+    """Return the shared pool for ``database_path``, creating it on first use."""
+    key = (database_path, readonly)
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            size = READ_POOL_SIZE if readonly else 1
+            pool = ConnectionPool(database_path, readonly=readonly, size=size)
+            _pools[key] = pool
+        return pool
+
+
+@contextmanager
+def read_connection(database_path):
+    """Yield a pooled read-only connection."""
+    with get_pool(database_path, readonly=True).connection() as conn:
+        yield conn
+
+
+@contextmanager
+def dedicated_read_connection(database_path):
+    """Yield a read-only connection outside the pool, closed afterwards.
+
+    For long-lived readers such as streamed exports, which would otherwise
+    hold a pooled connection for the whole download.
+    """
+    conn = connect(database_path, readonly=True)
+    try:
+        yield conn
+    finally:
+        conn.close()
+
+
+@contextmanager
+def write_connection(database_path):
+    """Yield the pooled writer connection inside a transaction.
+
+    The pool holds a single writer, so writes from the scheduler and any other
+    thread are serialized in-process rather than contending on SQLite's lock.
+    The outermost block commits on success and rolls back on error.
+    """
+    pool = get_pool(database_path, readonly=False)
+    with pool.connection() as conn:
+        if pool.is_nested():
+            yield conn
+            return
+        try:
+            yield conn
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+
+
+def close_all():
+    """Close every idle pooled connection (used on shutdown)."""
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.close()
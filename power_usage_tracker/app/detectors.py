@@ -0,0 +1,444 @@
+"""Streaming statistics and the anomaly detectors built on them.
+
+Every statistic is updated incrementally as readings arrive, so the cost per
+reading does not depend on how long the window is:
+
+- ``RollingWindow`` keeps a time-bounded window with running mean and
+  variance (O(1) amortised per sample) and, optionally, an
+  ``IndexableSkiplist`` of its values for median and MAD queries (O(log n)
+  per sample, O(log² n) per MAD).
+- ``Ewma`` is an exponentially weighted mean and variance with a half-life
+  in seconds, so irregular tick spacing is weighted correctly.
+
+The detectors only report; ``store_data`` logs what they find and counts it
+in ``/metrics``.
+"""
+import math
+import random
+from collections import deque
+
+# Scales the MAD to a standard deviation for normally distributed data.
+MAD_SCALE = 1.4826
+
+
+def _kth_smallest(a, len_a, b, len_b, k):
+    """Return the ``k``-th smallest (0-based) of two ascending sequences.
+
+    The sequences are given as index accessors so callers can expose views
+    of a list without copying it. Runs in O(log(len_a + len_b)).
+    """
+    lo, hi = max(0, k + 1 - len_b), min(k + 1, len_a)
+    while True:
+        i = (lo + hi) // 2
+        j = k + 1 - i
+        if i < len_a and j > 0 and b(j - 1) > a(i):
+            lo = i + 1
+        elif i > 0 and j < len_b and a(i - 1) > b(j):
+            hi = i - 1
+        else:
+            return max(a(i - 1) if i > 0 else -math.inf, b(j - 1) if j > 0 else -math.inf)
+
+
+class _SkiplistNode:
+    __slots__ = ('value', 'next', 'width')
+
+    def __init__(self, value, levels):
+        self.value = value
+        self.next = [None] * levels
+        self.width = [1] * levels
+
+
+class IndexableSkiplist:
+    """Sorted multiset with O(log n) insert, remove and lookup by rank.
+
+    Each link records how many positions it skips, so indexing walks down
+    the levels summing widths instead of scanning. ``expected_size`` sets the
+    number of levels; larger sizes still work, a little more slowly.
+    """
+
+    def __init__(self, expected_size=4096):
+        self._levels = max(1, int(math.log2(max(expected_size, 2))) + 1)
+        self._head = _SkiplistNode(None, self._levels)
+        self._tail = _SkiplistNode(math.inf, 0)
+        self._head.next = [self._tail] * self._levels
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    def __getitem__(self, index):
+        if not 0 <= index < self._size:
+            raise IndexError(index)
+        node = self._head
+        position = index + 1
+        for level in reversed(range(self._levels)):
+            while node.width[level] <= position:
+                position -= node.width[level]
+                node = node.next[level]
+        return node.value
+
+    def rank(self, value):
+        """Number of stored values less than ``value`` (like ``bisect_left``)."""
+        node = self._head
+        count = 0
+        for level in reversed(range(self._levels)):
+            while node.next[level].value < value:
+                count += node.width[level]
+                node = node.next[level]
+        return count
+
+    def insert(self, value):
+        chain = [None] * self._levels
+        steps = [0] * self._levels
+        node = self._head
+        for level in reversed(range(self._levels)):
+            while node.next[level].value <= value:
+                steps[level] += node.width[level]
+                node = node.next[level]
+            chain[level] = node
+
+        height = min(self._levels, 1 - int(math.log2(1.0 - random.random())))
+        new = _SkiplistNode(value, height)
+        skipped = 0
+        for level in range(height):
+            previous = chain[level]
+            new.next[level] = previous.next[level]
+            previous.next[level] = new
+            new.width[level] = previous.width[level] - skipped
+            previous.width[level] = skipped + 1
+            skipped += steps[level]
+        for level in range(height, self._levels):
+            chain[level].width[level] += 1
+        self._size += 1
+
+    def remove(self, value):
+        chain = [None] * self._levels
+        node = self._head
+        for level in reversed(range(self._levels)):
+            while node.next[level].value < value:
+                node = node.next[level]
+            chain[level] = node
+        target = chain[0].next[0]
+        if target.value != value:
+            raise ValueError(f"{value!r} not in skiplist")
+
+        for level in range(len(target.next)):
+            previous = chain[level]
+            previous.width[level] += target.width[level] - 1
+            previous.next[level] = target.next[level]
+        for level in range(len(target.next), self._levels):
+            chain[level].width[level] -= 1
+        self._size -= 1
+
+
+class RollingWindow:
+    """Samples from the last ``window_seconds``, with running summaries.
+
+    Mean and variance are maintained with Welford's update and its inverse
+    as samples enter and leave. With ``robust=True`` the values are also
+    kept in an ``IndexableSkiplist``, for ``median`` and ``mad``.
+    """
+
+    def __init__(self, window_seconds, robust=False):
+        self.window_seconds = window_seconds
+        self.robust = robust
+        self._samples = deque()
+        self._sorted = self._new_sorted()
+        self._mean = 0.0
+        self._m2 = 0.0
+
+    def _new_sorted(self):
+        # Sized for up to one sample per second.
+        return IndexableSkiplist(self.window_seconds) if self.robust else None
+
+    def clear(self):
+        self._samples.clear()
+        self._sorted = self._new_sorted()
+        self._mean = 0.0
+        self._m2 = 0.0
+
+    def __len__(self):
+        return len(self._samples)
+
+    def add(self, timestamp, value):
+        self.evict(timestamp)
+        self._samples.append((timestamp, value))
+        if self._sorted is not None:
+            self._sorted.insert(value)
+
+        delta = value - self._mean
+        self._mean += delta / len(self._samples)
+        self._m2 += delta * (value - self._mean)
+
+    def evict(self, now):
+        """Drop samples older than the window as of ``now``."""
+        cutoff = now - self.window_seconds
+        while self._samples and self._samples[0][0] <= cutoff:
+            _, value = self._samples.popleft()
+            if self._sorted is not None:
+                self._sorted.remove(value)
+
+            count = len(self._samples)
+            if not count:
+                self._mean = 0.0
+                self._m2 = 0.0
+                continue
+            delta = value - self._mean
+            self._mean -= delta / count
+            self._m2 = max(self._m2 - delta * (value - self._mean), 0.0)
+
+    @property
+    def mean(self):
+        return self._mean if self._samples else None
+
+    @property
+    def variance(self):
+        count = len(self._samples)
+        return self._m2 / (count - 1) if count > 1 else 0.0
+
+    @property
+    def stddev(self):
+        return math.sqrt(self.variance)
+
+    def median(self):
+        values = self._sorted
+        count = len(values)
+        if not count:
+            return None
+        middle = count // 2
+        if count % 2:
+            return values[middle]
+        return (values[middle - 1] + values[middle]) / 2
+
+    def mad(self):
+        """Median absolute deviation from the median, without a full pass.
+
+        Deviations below and above the median form two ascending sequences
+        over the sorted window, so their median is a k-th-smallest query.
+        """
+        values = self._sorted
+        count = len(values)
+        if not count:
+            return None
+        median = self.median()
+        split = values.rank(median)
+
+        def below(index):
+            return median - values[split - 1 - index]
+
+        def above(index):
+            return values[split + index] - median
+
+        upper = _kth_smallest(below, split, above, count - split, count // 2)
+        if count % 2:
+            return upper
+        lower = _kth_smallest(below, split, above, count - split, count // 2 - 1)
+        return (lower + upper) / 2
+
+
+class Ewma:
+    """Exponentially weighted mean and variance with a half-life in seconds."""
+
+    def __init__(self, halflife_seconds):
+        self.halflife_seconds = halflife_seconds
+        self.mean = None
+        self.variance = 0.0
+        self.count = 0
+        self._last_timestamp = None
+
+    def update(self, timestamp, value):
+        self.count += 1
+        if self.mean is None:
+            self.mean = value
+            self._last_timestamp = timestamp
+            return
+
+        elapsed = max(timestamp - self._last_timestamp, 0)
+        self._last_timestamp = timestamp
+        alpha = 1 - 0.5 ** (elapsed / self.halflife_seconds)
+        delta = value - self.mean
+        self.mean += alpha * delta
+        self.variance = (1 - alpha) * (self.variance + alpha * delta * delta)
+
+    @property
+    def stddev(self):
+        return math.sqrt(self.variance)
+
+    def snapshot(self):
+        return [self.mean, self.variance, self.count, self._last_timestamp]
+
+    def restore(self, snapshot):
+        self.mean, self.variance, self.count, self._last_timestamp = snapshot
+
+
+class LoadSpikeDetector:
+    """Flags a present load far above the recent window.
+
+    A reading is a spike when it is above ``min_load_kw``, more than
+    ``ratio`` times the window mean, and more than ``robust_threshold``
+    scaled MADs above the window median. The MAD test keeps a busy evening
+    with many large loads from being reported reading after reading.
+    """
+
+    name = 'load_spike'
+
+    def __init__(self, window_seconds=3600, ratio=3.0, min_load_kw=2.0,
+                 robust_threshold=5.0, min_samples=6):
+        self.window = RollingWindow(window_seconds, robust=True)
+        self.ratio = ratio
+        self.min_load_kw = min_load_kw
+        self.robust_threshold = robust_threshold
+        self.min_samples = min_samples
+
+    def update(self, timestamp, present_load):
+        self.window.evict(timestamp)
+        message = None
+        if len(self.window) >= self.min_samples and present_load > self.min_load_kw:
+            mean = self.window.mean
+            median = self.window.median()
+            spread = MAD_SCALE * self.window.mad()
+            robust_score = (present_load - median) / spread if spread else math.inf
+            if present_load > mean * self.ratio and robust_score > self.robust_threshold:
+                message = (
+                    f"Anomalous spike in PresentLoad detected: {present_load:.2f} "
+                    f"(recent average was {mean:.2f}, median {median:.2f})"
+                )
+        self.window.add(timestamp, present_load)
+        return message
+
+
+class ConsistencyDetector:
+    """Flags balance changes the EB and DG readings do not account for.
+
+    Two checks run on each new API reading: the balance moving while both
+    consumption readings are static, and a balance drop that differs from
+    the rise in EB + DG readings since the previous balance change by more
+    than usual. "Usual" is learned with an ``Ewma`` of that difference, so
+    steady fixed charges or rounding do not trigger it.
+    """
+
+    name = 'consistency'
+
+    def __init__(self, tolerance=1.0, sigmas=4.0, halflife_seconds=86400, min_samples=10):
+        self.tolerance = tolerance
+        self.sigmas = sigmas
+        self.min_samples = min_samples
+        self.residuals = Ewma(halflife_seconds)
+        self._previous = None
+        self._at_balance_change = None
+
+    def seed(self, balance, eb_value, dg_value):
+        """Start from readings restored after a restart."""
+        self._previous = self._at_balance_change = (balance, eb_value, dg_value)
+
+    def update(self, timestamp, balance, eb_value, dg_value):
+        previous, self._previous = self._previous, (balance, eb_value, dg_value)
+        if previous is None:
+            self._at_balance_change = self._previous
+            return None
+
+        last_balance, last_eb, last_dg = previous
+        if balance == last_balance:
+            return None
+
+        if eb_value == last_eb and dg_value == last_dg:
+            self._at_balance_change = self._previous
+            return (
+                f"Data inconsistency detected: Balance changed from {last_balance} to {balance}, "
+                f"but EB and DG readings are static."
+            )
+
+        start_balance, start_eb, start_dg = self._at_balance_change
+        self._at_balance_change = self._previous
+        balance_drop = start_balance - balance
+        if balance_drop <= 0:
+            return None  # Recharge or reset; nothing to compare.
+
+        consumed = (eb_value - start_eb) + (dg_value - start_dg)
+        residual = balance_drop - consumed
+        message = None
+        if self.residuals.count >= self.min_samples:
+            allowed = max(self.tolerance, self.sigmas * self.residuals.stddev)
+            if abs(residual - self.residuals.mean) > allowed:
+                message = (
+                    f"Data inconsistency detected: balance fell by ₹{balance_drop:.2f} "
+                    f"but EB and DG readings rose by ₹{consumed:.2f}."
+                )
+        self.residuals.update(timestamp, residual)
+        return message
+
+
+class StaleFeedDetector:
+    """Flags an upstream feed whose ``UpdatedOn`` stops advancing.
+
+    The usual gap between updates is learned with an ``Ewma``; the feed is
+    stale once the current gap exceeds ``factor`` times that, and never
+    sooner than ``min_stale_seconds``. Each stale episode is reported once,
+    and again when the feed recovers.
+    """
+
+    name = 'stale_feed'
+
+    def __init__(self, min_stale_seconds=300, factor=4.0, halflife_seconds=3600):
+        self.min_stale_seconds = min_stale_seconds
+        self.factor = factor
+        self.intervals = Ewma(halflife_seconds)
+        self.is_stale = False
+        self._source_timestamp = None
+        self._advanced_at = None
+
+    def update(self, now, source_timestamp):
+        if self._source_timestamp is None or source_timestamp > self._source_timestamp:
+            message = None
+            if self.is_stale:
+                message = f"Live feed recovered after {now - self._advanced_at:.0f}s without updates."
+                self.is_stale = False
+            elif self._advanced_at is not None:
+                self.intervals.update(now, now - self._advanced_at)
+            self._source_timestamp = source_timestamp
+            self._advanced_at = now
+            return message
+
+        gap = now - self._advanced_at
+        limit = max(self.min_stale_seconds, self.factor * (self.intervals.mean or 0))
+        if not self.is_stale and gap > limit:
+            self.is_stale = True
+            return (
+                f"Live feed is stale: no new reading for {gap:.0f}s "
+                f"(usually every {self.intervals.mean or 0:.0f}s)."
+            )
+        return None
+
+
+class AnomalyDetectors:
+    """The detectors for one meter."""
+
+    def __init__(self, spike_window_seconds=3600):
+        self.load_spike = LoadSpikeDetector(window_seconds=spike_window_seconds)
+        self.consistency = ConsistencyDetector()
+        self.stale_feed = StaleFeedDetector()
+
+    @classmethod
+    def from_config(cls, config):
+        return cls(spike_window_seconds=config.SPIKE_WINDOW_HOURS * 3600)
+
+    def warm_up(self, state, loads=None):
+        """Rebuild detector state from a freshly warm-started ``State``.
+
+        The load window is emptied and refilled from ``loads``, ``(epoch,
+        present_load)`` pairs oldest first, or from the ring buffer when none
+        are given. Both are bounded by the window, and refilling is safe to
+        repeat (e.g. on leader takeover).
+        """
+        if None not in (state.last_balance_value, state.last_eb_value, state.last_dg_value):
+            self.consistency.seed(state.last_balance_value, state.last_eb_value, state.last_dg_value)
+
+        window = self.load_spike.window
+        window.clear()
+        if loads is None:
+            latest = state.recent_readings.latest()
+            if not latest:
+                return
+            loads = state.recent_readings.since(latest[0] - window.window_seconds)
+        for timestamp_epoch, present_load in loads:
+            window.add(timestamp_epoch, present_load)
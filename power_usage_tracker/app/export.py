@@ -0,0 +1,116 @@
+import csv
+import io
+import json
+import logging
+import sqlite3
+import threading
+import zlib
+from datetime import datetime
+
+from .config import DEFAULT_METER_ID
+from .db import dedicated_read_connection
+from .queries import EXPORT_ROWS_SQL
+
+logger = logging.getLogger(__name__)
+
+EXPORT_FETCH_ROWS = 2000
+EXPORT_COLUMNS = (
+    "timestamp",
+    "ts_epoch",
+    "balance",
+    "present_load",
+    "amount_used",
+    "recharge_amount",
+    "samples",
+)
+EXPORT_FORMATS = {
+    "csv": ("text/csv", "csv"),
+    "ndjson": ("application/x-ndjson", "ndjson"),
+}
+# Each running export holds its own connection and a server thread.
+MAX_CONCURRENT_EXPORTS = 2
+
+_export_slots = threading.BoundedSemaphore(MAX_CONCURRENT_EXPORTS)
+
+
+def acquire_export_slot():
+    """Reserve one of ``MAX_CONCURRENT_EXPORTS``; ``False`` if all are taken."""
+    return _export_slots.acquire(blocking=False)
+
+
+def release_export_slot():
+    _export_slots.release()
+
+
+def iter_export_rows(database_path, start_epoch, end_epoch, meter_id=DEFAULT_METER_ID,
+                     fetch_rows=EXPORT_FETCH_ROWS):
+    """Yield chunks of one meter's ``power_usage`` rows in ``[start, end)``, oldest first.
+
+    Rows are pulled from one cursor with ``fetchmany`` so memory stays flat
+    however long the range is. The connection is opened for this export
+    alone, outside the dashboard's pool, and held until the generator finishes
+    or the client disconnects; in WAL mode this never blocks ingestion.
+    """
+    with dedicated_read_connection(database_path) as conn:
+        cursor = conn.execute(EXPORT_ROWS_SQL, (meter_id, start_epoch, end_epoch))
+        try:
+            while True:
+                rows = cursor.fetchmany(fetch_rows)
+                if not rows:
+                    return
+                yield rows
+        finally:
+            cursor.close()
+
+
+def _with_timestamp(row):
+    timestamp = datetime.utcfromtimestamp(row[0]).isoformat() + "Z"
+    return (timestamp,) + tuple(row)
+
+
+def encode_csv(chunks):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+    for rows in chunks:
+        writer.writerows(_with_timestamp(row) for row in rows)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def encode_ndjson(chunks):
+    for rows in chunks:
+        yield "".join(
+            json.dumps(dict(zip(EXPORT_COLUMNS, _with_timestamp(row))), separators=(",", ":")) + "\n"
+            for row in rows
+        )
+
+
+def gzip_stream(blocks):
+    """Gzip text blocks incrementally; only the compressor state is buffered."""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    for block in blocks:
+        data = compressor.compress(block.encode("utf-8"))
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def export_stream(database_path, start_epoch, end_epoch, export_format="csv", compress=False,
+                  meter_id=DEFAULT_METER_ID):
+    """Return a generator of response body blocks for ``/export``."""
+    encode = encode_csv if export_format == "csv" else encode_ndjson
+
+    def blocks():
+        try:
+            yield from encode(iter_export_rows(database_path, start_epoch, end_epoch, meter_id))
+        except sqlite3.Error as e:
+            # Headers are already sent; the client sees a truncated file.
+            logger.error(f"Database error during export: {e}")
+
+    if compress:
+        return gzip_stream(blocks())
+    return (block.encode("utf-8") for block in blocks())
@@ -0,0 +1,198 @@
+"""Balance-depletion forecast from running burn-rate statistics.
+
+``BurnRateForecast`` is updated by ``store_data`` with every accepted
+reading. Each update adds to the current local hour's totals; when the hour
+closes, its burn rate (₹ per hour) is folded into an ``Ewma`` for that hour
+of day, and its EB/DG split into an ``Ewma`` of the DG share. Updates are
+O(1) and history is never re-read: the statistics travel with the state
+snapshot instead (see ``State.snapshot``).
+
+``project`` walks the learned hourly profile forward from the current
+balance to find when it runs out, with a band from the per-hour variances.
+"""
+import math
+import threading
+from datetime import datetime
+
+import pytz
+
+from .detectors import Ewma
+from .rollups import HOUR_SECONDS, ROLLUP_TIMEZONE
+
+# Gaps longer than this between readings (feed outages, restarts) are not
+# counted as observed time, so they do not dilute the hour's burn rate.
+MAX_READING_GAP_SECONDS = 900
+# An hour is learned only when this much of it was observed.
+MIN_OBSERVED_SECONDS = 1800
+# Weight of past days in each hour-of-day statistic.
+HALFLIFE_SECONDS = 7 * 86400
+# Projections stop this far ahead.
+HORIZON_HOURS = 180 * 24
+# Two-sided 80% band under a normal approximation.
+BAND_CONFIDENCE = 0.8
+BAND_Z = 1.2816
+
+
+class BurnRateForecast:
+    """Burn rate by local hour of day and EB/DG mix for one meter."""
+
+    def __init__(self, timezone_name=ROLLUP_TIMEZONE):
+        self.timezone = pytz.timezone(timezone_name)
+        self.hourly = [Ewma(HALFLIFE_SECONDS) for _ in range(24)]
+        self.dg_share = Ewma(HALFLIFE_SECONDS)
+        self._lock = threading.Lock()
+        self._hour_of_day = None
+        self._hour_end = None
+        self._last_epoch = None
+        self._reset_hour()
+
+    def _reset_hour(self):
+        self._spent = 0.0
+        self._eb_spent = 0.0
+        self._dg_spent = 0.0
+        self._observed = 0.0
+
+    def update(self, epoch, amount_used, eb_used, dg_used):
+        """Add one reading: the balance spent and EB/DG readings' rise since the last one."""
+        with self._lock:
+            previous = self._last_epoch
+            if previous is not None and epoch <= previous:
+                return
+            self._last_epoch = epoch
+
+            if self._hour_end is None or epoch >= self._hour_end:
+                self._close_hour()
+                local = datetime.fromtimestamp(epoch, self.timezone)
+                hour_start = local.replace(minute=0, second=0, microsecond=0)
+                self._hour_of_day = local.hour
+                self._hour_end = hour_start.timestamp() + HOUR_SECONDS
+                self._reset_hour()
+
+            if previous is None or epoch - previous > MAX_READING_GAP_SECONDS:
+                return
+            self._observed += epoch - previous
+            self._spent += amount_used
+            self._eb_spent += max(eb_used, 0)
+            self._dg_spent += max(dg_used, 0)
+
+    def _close_hour(self):
+        if self._hour_end is None or self._observed < MIN_OBSERVED_SECONDS:
+            return
+        rate = self._spent / self._observed * HOUR_SECONDS
+        self.hourly[self._hour_of_day].update(self._hour_end, rate)
+        consumed = self._eb_spent + self._dg_spent
+        if consumed > 0:
+            self.dg_share.update(self._hour_end, self._dg_spent / consumed)
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'hourly': [slot.snapshot() for slot in self.hourly],
+                'dg_share': self.dg_share.snapshot(),
+                'hour': [
+                    self._hour_of_day, self._hour_end, self._last_epoch,
+                    self._spent, self._eb_spent, self._dg_spent, self._observed,
+                ],
+            }
+
+    def restore(self, snapshot):
+        with self._lock:
+            for slot, values in zip(self.hourly, snapshot['hourly']):
+                slot.restore(values)
+            self.dg_share.restore(snapshot['dg_share'])
+            (
+                self._hour_of_day, self._hour_end, self._last_epoch,
+                self._spent, self._eb_spent, self._dg_spent, self._observed,
+            ) = snapshot['hour']
+
+    def project(self, balance, now, low_balance_threshold=None):
+        """Project when ``balance`` runs out, starting at epoch ``now``.
+
+        Hours of day not learned yet use the average of the learned ones.
+        Returns ``None`` until at least one hour has been learned.
+        """
+        with self._lock:
+            learned = [(slot.mean, slot.variance) for slot in self.hourly if slot.count]
+            profile = [(slot.mean, slot.variance) if slot.count else None for slot in self.hourly]
+            dg_share = self.dg_share.mean
+        if not learned:
+            return None
+
+        fallback = (
+            sum(mean for mean, _ in learned) / len(learned),
+            sum(variance for _, variance in learned) / len(learned),
+        )
+        profile = [rates or fallback for rates in profile]
+
+        targets = {'depletion': balance}
+        if low_balance_threshold is not None:
+            targets['low_balance'] = balance - low_balance_threshold
+        crossings = {
+            (name, band): now if target <= 0 else None
+            for name, target in targets.items()
+            for band in ('earliest', 'expected', 'latest')
+        }
+
+        local = datetime.fromtimestamp(now, self.timezone)
+        hour_of_day = local.hour
+        step_start = now
+        step_end = local.replace(minute=0, second=0, microsecond=0).timestamp() + HOUR_SECONDS
+        spent = variance = 0.0
+        previous = {'earliest': 0.0, 'expected': 0.0, 'latest': 0.0}
+        for _ in range(HORIZON_HOURS):
+            if all(crossing is not None for crossing in crossings.values()):
+                break
+            fraction = (step_end - step_start) / HOUR_SECONDS
+            mean, slot_variance = profile[hour_of_day]
+            spent += mean * fraction
+            variance += slot_variance * fraction * fraction
+            spread = BAND_Z * math.sqrt(variance)
+            current = {
+                'earliest': spent + spread,
+                'expected': spent,
+                'latest': max(spent - spread, 0.0),
+            }
+            for (name, band), crossing in crossings.items():
+                target = targets[name]
+                if crossing is None and current[band] >= target:
+                    # Interpolate within the hour.
+                    rise = current[band] - previous[band]
+                    share = (target - previous[band]) / rise if rise else 1.0
+                    crossings[(name, band)] = step_start + share * (step_end - step_start)
+            previous = current
+            step_start, step_end = step_end, step_end + HOUR_SECONDS
+            hour_of_day = (hour_of_day + 1) % 24
+
+        def moment(name, band, as_date=False):
+            epoch = crossings.get((name, band))
+            if epoch is None:
+                return None
+            local_time = datetime.fromtimestamp(epoch, self.timezone)
+            return local_time.date().isoformat() if as_date else local_time.isoformat()
+
+        daily = sum(mean for mean, _ in profile)
+        result = {
+            'hours_learned': len(learned),
+            'confidence': BAND_CONFIDENCE,
+            'burn_rate': {
+                'daily': round(daily, 2),
+                'hourly': [round(mean, 4) for mean, _ in profile],
+            },
+            'mix': None if dg_share is None else {
+                'eb': round(1 - dg_share, 4),
+                'dg': round(dg_share, 4),
+            },
+            'depletion': {
+                band: moment('depletion', band) for band in ('earliest', 'expected', 'latest')
+            },
+            'low_balance_alert': None,
+        }
+        if 'low_balance' in targets:
+            result['low_balance_alert'] = {
+                'threshold': low_balance_threshold,
+                **{
+                    band: moment('low_balance', band, as_date=True)
+                    for band in ('earliest', 'expected', 'latest')
+                },
+            }
+        return result
@@ -0,0 +1,124 @@
+import json
+import sqlite3
+import threading
+import time
+import logging
+
+from .config import DEFAULT_METER_ID
+from .db import read_connection, write_connection
+
+logger = logging.getLogger(__name__)
+
+
+def home_data_key(meter_id=DEFAULT_METER_ID):
+    """``app_metadata`` key holding a meter's last good HomeData response."""
+    return f'home_data:{meter_id}'
+
+
+class HomeDataCache:
+    """Last good HomeData API response, refreshed in the background.
+
+    Readers never wait on the upstream API once a value has been fetched:
+    ``get`` returns the cached response and its age immediately, and keeps
+    returning the last good value while the upstream is failing. Concurrent
+    refreshes collapse into a single in-flight fetch.
+
+    With a ``database_path``, each good response is also saved to
+    ``app_metadata`` so worker processes that do not poll the API can
+    ``load`` it instead of fetching their own.
+    """
+
+    def __init__(self, api_client, database_path=None, meter_id=DEFAULT_METER_ID):
+        self.api_client = api_client
+        self.database_path = database_path
+        self.meter_id = meter_id
+        self._value = None
+        self._fetched_at = None
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+
+    def get(self):
+        """Return ``(home_data, age_seconds)``; both are ``None`` before the first fetch."""
+        with self._lock:
+            if self._value is None:
+                return None, None
+            return self._value, time.time() - self._fetched_at
+
+    def refresh(self):
+        """Fetch from the API, or wait for a fetch already in flight.
+
+        Returns the freshest value available afterwards, which is the previous
+        good value if the fetch failed.
+        """
+        if not self._refresh_lock.acquire(blocking=False):
+            # Another thread is fetching; wait for it instead of fetching again.
+            with self._refresh_lock:
+                pass
+            return self.get()
+
+        try:
+            home_data = self.api_client.fetch_home_data()
+            if home_data and home_data.get('Data'):
+                fetched_at = time.time()
+                with self._lock:
+                    self._value = home_data
+                    self._fetched_at = fetched_at
+                self._save(home_data, fetched_at)
+            else:
+                logger.warning("Home data refresh failed; serving last good value")
+        finally:
+            self._refresh_lock.release()
+
+        return self.get()
+
+    def get_or_refresh(self):
+        """Return the cached value, fetching only if nothing has been cached
+        or saved by another process yet."""
+        home_data, age_seconds = self.get()
+        if home_data is None:
+            home_data, age_seconds = self.load()
+        if home_data is None:
+            return self.refresh()
+        return home_data, age_seconds
+
+    def _save(self, home_data, fetched_at):
+        if not self.database_path:
+            return
+        try:
+            with write_connection(self.database_path) as conn:
+                conn.execute(
+                    '''
+                    INSERT INTO app_metadata (key, value) VALUES (?, ?)
+                    ON CONFLICT(key) DO UPDATE SET value = excluded.value
+                    ''',
+                    (home_data_key(self.meter_id), json.dumps({'fetched_at': fetched_at, 'data': home_data}))
+                )
+        except sqlite3.Error as e:
+            logger.error(f"Database error saving home data: {e}")
+
+    def load(self):
+        """Adopt the response saved by the polling process if it is newer.
+
+        Returns ``get()`` afterwards.
+        """
+        if not self.database_path:
+            return self.get()
+        try:
+            with read_connection(self.database_path) as conn:
+                row = conn.execute(
+                    'SELECT value FROM app_metadata WHERE key = ?', (home_data_key(self.meter_id),)
+                ).fetchone()
+        except sqlite3.Error as e:
+            logger.error(f"Database error loading home data: {e}")
+            return self.get()
+
+        if row:
+            try:
+                saved = json.loads(row[0])
+                with self._lock:
+                    if self._fetched_at is None or saved['fetched_at'] > self._fetched_at:
+                        self._value = saved['data']
+                        self._fetched_at = saved['fetched_at']
+            except (ValueError, KeyError, TypeError) as e:
+                logger.error(f"Ignoring unreadable saved home data for meter {self.meter_id}: {e}")
+        return self.get()
@@ -0,0 +1,321 @@
+"""Bulk import of historical readings into ``power_usage``.
+
+Reads CSV (with a header row) or JSON-lines files, optionally gzipped, with
+one reading per row:
+
+- ``ts_epoch`` (UTC epoch seconds) or ``timestamp`` (ISO 8601; naive values
+  are taken as UTC, as stored in the database)
+- ``balance``
+- ``present_load``
+- ``samples`` (optional, default 1): raw readings a compacted row stands for
+
+Rows must be in ascending time order, which is how ``/export`` writes them.
+``amount_used``/``recharge_amount`` are recomputed from consecutive balances
+with the same rule as ``store_data``; any values in the file are ignored.
+Imported rows are merged with the stored history: each is compared with the
+reading just before it, stored or imported, and a stored reading that gets a
+new predecessor has its usage (and rollups) recomputed, so filling a gap
+never counts the usage across it twice. No alerts are sent. Rows whose
+timestamp is already stored, or whose minute compaction has already folded
+into one summary row, are skipped, so re-running an import is harmless.
+
+    python -m app.importer backup.csv.gz --database power_usage_index.db --meter flat-a
+
+A running server keeps its in-memory state and caches; restart it after an
+import to pick up the new history.
+"""
+import argparse
+import csv
+import gzip
+import io
+import json
+import logging
+import os
+import sqlite3
+import sys
+import time
+from datetime import datetime
+
+import pytz
+
+from .compaction import get_watermark, watermark_key
+from .config import DEFAULT_METER_ID
+from .data_manager import balance_delta, init_db
+from .db import write_connection
+from .rollups import apply_readings, mark_history_rewritten
+
+logger = logging.getLogger(__name__)
+
+IMPORT_BATCH_ROWS = 10000
+
+
+class ImportStats:
+    def __init__(self):
+        self.read = 0
+        self.inserted = 0
+        self.duplicate = 0
+        self.unchanged = 0
+        self.recomputed = 0
+        self.out_of_order = 0
+        self.invalid = 0
+        self.started = time.perf_counter()
+
+    @property
+    def rows_per_second(self):
+        elapsed = time.perf_counter() - self.started
+        return self.read / elapsed if elapsed > 0 else 0.0
+
+    def summary(self):
+        return (
+            f"read {self.read}, inserted {self.inserted}, duplicate {self.duplicate}, "
+            f"unchanged {self.unchanged}, stored rows recomputed {self.recomputed}, "
+            f"out of order {self.out_of_order}, invalid {self.invalid} "
+            f"in {time.perf_counter() - self.started:.1f}s ({self.rows_per_second:,.0f} rows/s)"
+        )
+
+
+def _open_text(path):
+    if path == '-':
+        return io.TextIOWrapper(sys.stdin.buffer, encoding='utf-8')
+    if path.endswith('.gz'):
+        return gzip.open(path, 'rt', encoding='utf-8', newline='')
+    return open(path, 'r', encoding='utf-8', newline='')
+
+
+def _detect_format(path):
+    name = path[:-3] if path.endswith('.gz') else path
+    return 'csv' if name.endswith('.csv') else 'jsonl'
+
+
+def iter_records(path, file_format=None):
+    """Yield one dict per input row from a CSV or JSON-lines file."""
+    file_format = file_format or _detect_format(path)
+    with _open_text(path) as f:
+        if file_format == 'csv':
+            yield from csv.DictReader(f)
+        else:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    yield {}  # counted as invalid by parse_record
+
+
+def parse_record(record):
+    """Return ``(ts_epoch, balance, present_load, samples)`` or raise ``ValueError``."""
+    try:
+        if record.get('ts_epoch') not in (None, ''):
+            ts_epoch = int(float(record['ts_epoch']))
+        else:
+            timestamp = datetime.fromisoformat(str(record['timestamp']).replace('Z', '+00:00'))
+            if timestamp.tzinfo is None:
+                timestamp = pytz.utc.localize(timestamp)
+            ts_epoch = int(timestamp.timestamp())
+        samples = record.get('samples')
+        samples = int(float(samples)) if samples not in (None, '') else 1
+        return ts_epoch, float(record['balance']), float(record['present_load']), max(samples, 1)
+    except (KeyError, TypeError) as e:
+        raise ValueError(f"missing or malformed field: {e}") from e
+
+
+def _write_batch(database_path, meter_id, batch, stats):
+    """Merge one batch of ``(ts_epoch, balance, present_load, samples)`` rows.
+
+    Walks the imported rows together with the stored rows they interleave
+    with, plus the first stored row after the batch, computing each row's
+    usage against whichever reading precedes it. Stored rows whose usage
+    changes are updated and their rollup buckets corrected by the difference.
+
+    A minute already summarised by compaction (behind the meter's watermark,
+    or holding a row with ``samples > 1``) stands for every raw reading in
+    it, so imported rows falling in such a minute are duplicates.
+    """
+    first_minute, last_epoch = batch[0][0] // 60 * 60, batch[-1][0]
+    with write_connection(database_path) as conn:
+        watermark = get_watermark(conn, meter_id)
+        before = conn.execute(
+            '''
+            SELECT balance FROM power_usage
+            WHERE meter_id = ? AND ts_epoch < ?
+            ORDER BY ts_epoch DESC LIMIT 1
+            ''',
+            (meter_id, first_minute)
+        ).fetchone()
+        stored = conn.execute(
+            '''
+            SELECT id, ts_epoch, balance, amount_used, recharge_amount, samples FROM power_usage
+            WHERE meter_id = ? AND ts_epoch >= ? AND ts_epoch <= ?
+            ORDER BY ts_epoch
+            ''',
+            (meter_id, first_minute, last_epoch)
+        ).fetchall()
+        following = conn.execute(
+            '''
+            SELECT id, ts_epoch, balance, amount_used, recharge_amount, samples FROM power_usage
+            WHERE meter_id = ? AND ts_epoch > ?
+            ORDER BY ts_epoch LIMIT 1
+            ''',
+            (meter_id, last_epoch)
+        ).fetchone()
+        if following:
+            stored.append(following)
+
+        stored_epochs = {row[1] for row in stored}
+        compacted_minutes = {
+            row[1] // 60 * 60 for row in stored
+            if (row[5] or 1) > 1 or (watermark is not None and row[1] < watermark)
+        }
+        previous_balance = before[0] if before else None
+        previous_imported = False
+        inserts = []
+        updates = []
+        rollups = []
+        position = 0
+        for ts_epoch, balance, present_load, samples in batch:
+            if ts_epoch in stored_epochs or ts_epoch // 60 * 60 in compacted_minutes:
+                stats.duplicate += 1
+                continue
+            # Stored rows before this one keep or take over the predecessor.
+            while position < len(stored) and stored[position][1] < ts_epoch:
+                previous_balance = _restate(stored[position], previous_balance, previous_imported, updates, rollups)
+                previous_imported = False
+                position += 1
+
+            # Same rule as store_data: only balance changes are stored.
+            if previous_balance == balance:
+                stats.unchanged += 1
+                continue
+            amount_used, recharge_amount = (0, 0)
+            if previous_balance is not None:
+                amount_used, recharge_amount = balance_delta(previous_balance, balance)
+            inserts.append((
+                meter_id, datetime.utcfromtimestamp(ts_epoch), ts_epoch, balance, present_load,
+                amount_used, recharge_amount, samples
+            ))
+            rollups.append((ts_epoch, amount_used, recharge_amount, samples))
+            previous_balance = balance
+            previous_imported = True
+
+        if position < len(stored):
+            _restate(stored[position], previous_balance, previous_imported, updates, rollups)
+
+        conn.executemany(
+            '''
+            INSERT INTO power_usage (meter_id, timestamp, ts_epoch, balance, present_load, amount_used, recharge_amount, samples)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ''',
+            inserts
+        )
+        conn.executemany(
+            'UPDATE power_usage SET amount_used = ?, recharge_amount = ? WHERE id = ?',
+            updates
+        )
+        apply_readings(conn, rollups, meter_id)
+        if inserts or updates:
+            mark_history_rewritten(conn, meter_id)
+
+        # Let the compaction job revisit history imported behind its watermark.
+        if inserts:
+            conn.execute(
+                'UPDATE app_metadata SET value = CAST(MIN(CAST(value AS INTEGER), ?) AS TEXT) WHERE key = ?',
+                (inserts[0][2] // 60 * 60, watermark_key(meter_id))
+            )
+    stats.inserted += len(inserts)
+    stats.recomputed += len(updates)
+
+
+def _restate(row, previous_balance, previous_imported, updates, rollups):
+    """Recompute a stored row's usage if an imported row now precedes it.
+
+    Compacted rows are left alone: their usage is the sum over a minute of
+    readings, which one balance difference cannot reproduce. Returns the
+    row's balance, the predecessor of whatever follows it.
+    """
+    row_id, ts_epoch, balance, amount_used, recharge_amount, samples = row
+    if previous_imported and (samples or 1) == 1:
+        new_amount_used, new_recharge_amount = balance_delta(previous_balance, balance)
+        if (new_amount_used, new_recharge_amount) != (amount_used or 0, recharge_amount or 0):
+            updates.append((new_amount_used, new_recharge_amount, row_id))
+            rollups.append((
+                ts_epoch,
+                new_amount_used - (amount_used or 0),
+                new_recharge_amount - (recharge_amount or 0),
+                0,
+            ))
+    return balance
+
+
+def import_readings(database_path, paths, file_format=None, batch_rows=IMPORT_BATCH_ROWS,
+                    progress=None, meter_id=DEFAULT_METER_ID):
+    """Stream ``paths`` into ``meter_id``'s history in ``batch_rows`` transactions.
+
+    Memory use is bounded by the batch size regardless of input length.
+    Returns an ``ImportStats``.
+    """
+    stats = ImportStats()
+    previous_epoch = None
+    batch = []
+
+    for path in paths:
+        for record in iter_records(path, file_format):
+            stats.read += 1
+            try:
+                reading = parse_record(record)
+            except ValueError as e:
+                stats.invalid += 1
+                logger.debug(f"Skipping row {stats.read} of {path}: {e}")
+                continue
+
+            if previous_epoch is not None and reading[0] <= previous_epoch:
+                stats.out_of_order += 1
+                continue
+            previous_epoch = reading[0]
+
+            batch.append(reading)
+            if len(batch) >= batch_rows:
+                _write_batch(database_path, meter_id, batch, stats)
+                batch = []
+                if progress:
+                    progress(stats)
+
+    if batch:
+        _write_batch(database_path, meter_id, batch, stats)
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument('paths', nargs='+', help="CSV or JSON-lines files ('-' for stdin)")
+    parser.add_argument(
+        '--database', default=os.environ.get('POWER_USAGE_DATABASE', 'power_usage_index.db')
+    )
+    parser.add_argument('--meter', default=DEFAULT_METER_ID, help='meter id the readings belong to')
+    parser.add_argument('--format', choices=('csv', 'jsonl'), help='override detection by file extension')
+    parser.add_argument('--batch-rows', type=int, default=IMPORT_BATCH_ROWS)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(message)s')
+    init_db(args.database)
+
+    def progress(stats):
+        print(f"... {stats.read} rows read ({stats.rows_per_second:,.0f} rows/s)", file=sys.stderr)
+
+    try:
+        stats = import_readings(
+            args.database, args.paths, args.format, args.batch_rows, progress, args.meter
+        )
+    except (OSError, ValueError, csv.Error, sqlite3.Error) as e:
+        sys.exit(f"Import failed: {e}")
+
+    print(f"Imported into {args.database}: {stats.summary()}")
+    if stats.inserted:
+        print("Restart a running server to refresh its in-memory state and caches.")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,50 @@
+import logging
+import os
+
+try:
+    import fcntl
+except ImportError:  # Windows: no multi-worker server, so every process leads.
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+
+class LeaderLock:
+    """Exclusive, non-blocking file lock naming the process that runs the jobs.
+
+    When the tracker is served by several worker processes, only the holder of
+    this lock polls the meters and sends alerts; the others serve dashboard
+    reads. The kernel releases the lock however the holder exits, so another
+    worker takes over on its next ``try_acquire``.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._file = None
+
+    @property
+    def is_held(self):
+        return self._file is not None
+
+    def try_acquire(self):
+        """Take the lock if it is free; return whether this process holds it."""
+        if self._file is not None:
+            return True
+        if fcntl is None:
+            self._file = True
+            return True
+
+        lock_file = open(self.path, 'a+')
+        try:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return False
+
+        lock_file.seek(0)
+        lock_file.truncate()
+        lock_file.write(f"{os.getpid()}\n")
+        lock_file.flush()
+        self._file = lock_file
+        logger.info(f"Process {os.getpid()} is now the scheduler leader")
+        return True
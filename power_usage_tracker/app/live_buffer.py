@@ -0,0 +1,68 @@
+import threading
+from array import array
+
+# Enough for the 120-minute live trend window even at a 7-second fetch interval.
+LIVE_BUFFER_CAPACITY = 1024
+
+
+class ReadingRingBuffer:
+    """Fixed-size ring buffer of the most recent stored readings.
+
+    Columns are kept in parallel ``array('d')`` slots (epoch seconds, present
+    load in kW, balance) so memory stays constant and appends never allocate.
+    Readings are appended in ingestion order, which is chronological.
+    """
+
+    def __init__(self, capacity=LIVE_BUFFER_CAPACITY):
+        self.capacity = capacity
+        self._timestamps = array("d", bytes(8 * capacity))
+        self._loads = array("d", bytes(8 * capacity))
+        self._balances = array("d", bytes(8 * capacity))
+        self._next = 0
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return self._count
+
+    def append(self, timestamp_epoch, present_load, balance):
+        with self._lock:
+            index = self._next
+            self._timestamps[index] = timestamp_epoch
+            self._loads[index] = present_load
+            self._balances[index] = balance
+            self._next = (index + 1) % self.capacity
+            self._count = min(self._count + 1, self.capacity)
+
+    def latest(self):
+        """Return ``(timestamp_epoch, present_load, balance)`` or ``None``."""
+        with self._lock:
+            if not self._count:
+                return None
+            index = (self._next - 1) % self.capacity
+            return (
+                self._timestamps[index],
+                self._loads[index],
+                self._balances[index],
+            )
+
+    def since(self, start_epoch, limit=None):
+        """Return ``(timestamp_epoch, present_load)`` pairs at or after ``start_epoch``.
+
+        Results are oldest-first and, like ``ORDER BY timestamp ASC LIMIT``,
+        truncated to the first ``limit`` readings in the window.
+        """
+        with self._lock:
+            points = []
+            index = self._next
+            for _ in range(self._count):
+                index = (index - 1) % self.capacity
+                timestamp_epoch = self._timestamps[index]
+                if timestamp_epoch < start_epoch:
+                    break
+                points.append((timestamp_epoch, self._loads[index]))
+
+        points.reverse()
+        if limit is not None:
+            return points[:limit]
+        return points
@@ -8,3 +8,6 @@ def setup_logging():
         format='%(asctime)s - %(levelname)s - %(message)s',
         stream=sys.stdout  # Ensure logs go to stdout for Docker
     )
+    # APScheduler logs every job run at INFO; the follower sync alone runs
+    # every 2 seconds. Failures are still logged at ERROR.
+    logging.getLogger('apscheduler.executors.default').setLevel(logging.WARNING)
@@ -0,0 +1,50 @@
+from collections import OrderedDict
+
+from .api_client import ApiClient
+from .detectors import AnomalyDetectors
+from .home_data_cache import HomeDataCache
+from .state import State
+
+
+class Meter:
+    """Runtime objects for one polled meter.
+
+    Each meter gets its own ``State``, API session, circuit breakers and home
+    data cache, so a slow or failing meter never holds up the others.
+    """
+
+    def __init__(self, meter_config, api_client=None):
+        self.id = meter_config.METER_ID
+        self.name = meter_config.METER_NAME
+        self.config = meter_config
+        self.state = State(AnomalyDetectors.from_config(meter_config))
+        self.api_client = api_client or ApiClient(meter_config)
+        self.home_data_cache = HomeDataCache(self.api_client, meter_config.DATABASE, self.id)
+
+
+class MeterRegistry:
+    """The meters served by this process, in configuration order."""
+
+    def __init__(self, meters):
+        self._meters = OrderedDict((meter.id, meter) for meter in meters)
+
+    @classmethod
+    def from_config(cls, config):
+        return cls(Meter(meter_config) for meter_config in config.METERS)
+
+    @property
+    def default(self):
+        return next(iter(self._meters.values()))
+
+    def get(self, meter_id=None):
+        """Return the meter for ``meter_id``, the first meter when it is empty,
+        or ``None`` for an unknown id."""
+        if not meter_id:
+            return self.default
+        return self._meters.get(meter_id)
+
+    def __iter__(self):
+        return iter(self._meters.values())
+
+    def __len__(self):
+        return len(self._meters)
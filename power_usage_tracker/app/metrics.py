@@ -0,0 +1,136 @@
+"""Metrics exposed at ``/metrics`` in the Prometheus text format.
+
+Built on ``prometheus_client``. When ``PROMETHEUS_MULTIPROC_DIR`` is set
+before this module is first imported, every process records into shared
+files there and a scrape answered by any of them reports the totals of all.
+Without it, as under ``flask run``, values live in process memory. Either
+way they reset on restart, which Prometheus handles through counter resets.
+"""
+import os
+import time
+from datetime import datetime
+
+import pytz
+from flask import request
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+)
+from prometheus_client import multiprocess
+
+CONTENT_TYPE = CONTENT_TYPE_LATEST
+
+# Upper bounds in seconds; suits both sub-millisecond SQL and multi-second
+# upstream calls.
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+UPSTREAM_REQUEST_SECONDS = Histogram(
+    'power_usage_upstream_request_seconds',
+    'Latency of each upstream API attempt; outcome="error" attempts are retried.',
+    ('meter', 'endpoint', 'outcome'),
+    buckets=DEFAULT_BUCKETS,
+)
+STORE_DATA_SECONDS = Histogram(
+    'power_usage_store_data_seconds',
+    'Time spent processing one reading in store_data.',
+    ('meter',),
+    buckets=DEFAULT_BUCKETS,
+)
+HTTP_REQUEST_SECONDS = Histogram(
+    'power_usage_http_request_seconds',
+    'Time to build a dashboard response, by route.',
+    ('endpoint', 'status'),
+    buckets=DEFAULT_BUCKETS,
+)
+SQL_QUERY_SECONDS = Histogram(
+    'power_usage_sql_query_seconds',
+    'Time spent in dashboard database queries.',
+    ('query',),
+    buckets=DEFAULT_BUCKETS,
+)
+READINGS_SKIPPED = Counter(
+    'power_usage_readings_skipped_total',
+    'Readings dropped before storage, by reason.',
+    ('meter', 'reason'),
+)
+ANOMALIES_DETECTED = Counter(
+    'power_usage_anomalies_total',
+    'Anomalies reported by the streaming detectors, by detector.',
+    ('meter', 'detector'),
+)
+ALERTS_RAISED = Counter(
+    'power_usage_alerts_total',
+    'Alerts raised by incoming readings.',
+    ('meter',),
+)
+TELEGRAM_SENDS = Counter(
+    'power_usage_telegram_sends_total',
+    'Telegram send attempts from the outbox, by outcome.',
+    ('outcome',),
+)
+# Only the scheduler leader sets this; livemax reports its value alone.
+SCHEDULER_LAG_SECONDS = Gauge(
+    'power_usage_scheduler_lag_seconds',
+    'Delay between the scheduled and actual start of the latest run of a job.',
+    ('job',),
+    multiprocess_mode='livemax',
+)
+SCHEDULER_MISSED_RUNS = Counter(
+    'power_usage_scheduler_missed_runs_total',
+    'Job runs skipped because they started too late.',
+    ('job',),
+)
+
+
+def render():
+    """Return the scrape body, aggregated across workers when multiprocess."""
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry)
+    return generate_latest(REGISTRY)
+
+
+def upstream_latency_listener(meter_id):
+    """Return an ``ApiClient.latency_listeners`` callback for one meter."""
+    def listener(endpoint, seconds, outcome):
+        UPSTREAM_REQUEST_SECONDS.labels(meter_id, endpoint, outcome).observe(seconds)
+    return listener
+
+
+def instrument_app(app):
+    """Time every request by its URL rule, so ids in paths never add series."""
+    @app.before_request
+    def start_timer():
+        request.environ['power_usage.started'] = time.perf_counter()
+
+    @app.after_request
+    def record_duration(response):
+        started = request.environ.get('power_usage.started')
+        if started is not None:
+            endpoint = request.url_rule.rule if request.url_rule else 'unmatched'
+            HTTP_REQUEST_SECONDS.labels(endpoint, response.status_code).observe(
+                time.perf_counter() - started
+            )
+        return response
+
+
+def watch_scheduler(scheduler):
+    """Track job start lag and missed runs from APScheduler events."""
+    from apscheduler.events import EVENT_JOB_MISSED, EVENT_JOB_SUBMITTED
+
+    def on_event(event):
+        if event.code == EVENT_JOB_MISSED:
+            SCHEDULER_MISSED_RUNS.labels(event.job_id).inc()
+            return
+        # With coalescing several overdue run times collapse into one run.
+        scheduled = max(event.scheduled_run_times)
+        lag = (datetime.now(pytz.utc) - scheduled).total_seconds()
+        SCHEDULER_LAG_SECONDS.labels(event.job_id).set(max(lag, 0.0))
+
+    scheduler.add_listener(on_event, EVENT_JOB_SUBMITTED | EVENT_JOB_MISSED)
@@ -0,0 +1,184 @@
+import logging
+import time
+
+from .config import DEFAULT_METER_ID
+from .db import write_connection
+from .rollups import init_rollup_tables
+
+logger = logging.getLogger(__name__)
+
+# Rows touched per transaction when rewriting existing data, so a large
+# upgrade never holds the write lock long enough to stall ingestion.
+MIGRATION_BATCH_SIZE = 5000
+
+
+def get_schema_version(conn):
+    return conn.execute('PRAGMA user_version').fetchone()[0]
+
+
+def _column_names(conn, table):
+    return {row[1] for row in conn.execute(f'PRAGMA table_info({table})')}
+
+
+def _add_epoch_timestamps(database_path):
+    """Store reading times as integer epoch seconds next to the text column.
+
+    Range filters and bucketing then compare integers instead of parsing
+    ``timestamp`` with ``strftime`` on every row. Existing rows are backfilled
+    in id ranges of ``MIGRATION_BATCH_SIZE``.
+    """
+    with write_connection(database_path) as conn:
+        if 'ts_epoch' not in _column_names(conn, 'power_usage'):
+            conn.execute('ALTER TABLE power_usage ADD COLUMN ts_epoch INTEGER')
+        max_id = conn.execute('SELECT COALESCE(MAX(id), 0) FROM power_usage').fetchone()[0]
+
+    for batch_start in range(0, max_id, MIGRATION_BATCH_SIZE):
+        with write_connection(database_path) as conn:
+            conn.execute('''
+                UPDATE power_usage
+                SET ts_epoch = CAST(strftime('%s', timestamp) AS INTEGER)
+                WHERE id > ? AND id <= ? AND ts_epoch IS NULL
+            ''', (batch_start, batch_start + MIGRATION_BATCH_SIZE))
+
+    with write_connection(database_path) as conn:
+        conn.execute('CREATE INDEX IF NOT EXISTS ts_epoch_idx ON power_usage(ts_epoch)')
+        # Every query now filters and orders on ts_epoch.
+        conn.execute('DROP INDEX IF EXISTS timestamp_idx')
+
+
+def _add_query_indexes(database_path):
+    """Replace the single-column indexes with ones shaped by the queries.
+
+    The covering index serves latest-record and ring-buffer reads straight
+    from the index. ``recharge_amount`` is almost always 0, so indexing the
+    column was nearly useless; a partial index holds only recharge rows.
+    """
+    with write_connection(database_path) as conn:
+        conn.execute('''
+            CREATE INDEX IF NOT EXISTS ts_epoch_covering_idx
+            ON power_usage(ts_epoch, amount_used, present_load, balance)
+        ''')
+        conn.execute('''
+            CREATE INDEX IF NOT EXISTS recharge_ts_epoch_idx
+            ON power_usage(ts_epoch) WHERE recharge_amount > 0
+        ''')
+        conn.execute('DROP INDEX IF EXISTS ts_epoch_idx')
+        conn.execute('DROP INDEX IF EXISTS recharge_amount_idx')
+
+
+def _prepare_compaction(database_path):
+    """Schema needed to downsample old readings and give the space back.
+
+    ``samples`` counts the raw readings a row stands for (1 until compacted),
+    ``app_metadata`` holds the compaction watermark, and incremental
+    auto_vacuum lets the compaction job release freed pages in small steps.
+    Switching auto_vacuum mode needs one full ``VACUUM``.
+    """
+    with write_connection(database_path) as conn:
+        if 'samples' not in _column_names(conn, 'power_usage'):
+            conn.execute('ALTER TABLE power_usage ADD COLUMN samples INTEGER NOT NULL DEFAULT 1')
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS app_metadata (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL
+            )
+        ''')
+
+    with write_connection(database_path) as conn:
+        if conn.execute('PRAGMA auto_vacuum').fetchone()[0] != 2:
+            conn.execute('PRAGMA auto_vacuum = INCREMENTAL')
+            conn.execute('VACUUM')
+
+
+def _add_meter_ids(database_path):
+    """Key readings and rollups by meter so one database serves many meters.
+
+    Existing rows belong to the single meter configured so far, which keeps
+    the ``DEFAULT_METER_ID``. The query indexes gain ``meter_id`` as their
+    leading column, and the rollup tables are rebuilt with a composite key.
+    """
+    with write_connection(database_path) as conn:
+        if 'meter_id' not in _column_names(conn, 'power_usage'):
+            conn.execute(
+                f"ALTER TABLE power_usage ADD COLUMN meter_id TEXT NOT NULL DEFAULT '{DEFAULT_METER_ID}'"
+            )
+        conn.execute('''
+            CREATE INDEX IF NOT EXISTS meter_ts_epoch_covering_idx
+            ON power_usage(meter_id, ts_epoch, amount_used, present_load, balance)
+        ''')
+        conn.execute('''
+            CREATE INDEX IF NOT EXISTS meter_recharge_ts_epoch_idx
+            ON power_usage(meter_id, ts_epoch) WHERE recharge_amount > 0
+        ''')
+        conn.execute('DROP INDEX IF EXISTS ts_epoch_covering_idx')
+        conn.execute('DROP INDEX IF EXISTS recharge_ts_epoch_idx')
+        conn.execute(
+            'UPDATE app_metadata SET key = ? WHERE key = ?',
+            (f'compacted_before:{DEFAULT_METER_ID}', 'compacted_before')
+        )
+
+    rollup_keys = {
+        'power_usage_minute': 'bucket_start',
+        'power_usage_hour': 'bucket_start',
+        'power_usage_daily': 'local_date',
+    }
+    with write_connection(database_path) as conn:
+        legacy = [
+            table for table in rollup_keys
+            if _column_names(conn, table) and 'meter_id' not in _column_names(conn, table)
+        ]
+        for table in legacy:
+            conn.execute(f'ALTER TABLE {table} RENAME TO {table}_single_meter')
+        init_rollup_tables(conn.cursor())
+        for table in legacy:
+            key = rollup_keys[table]
+            conn.execute(f'''
+                INSERT INTO {table} (meter_id, {key}, amount_used, recharge_amount, samples)
+                SELECT ?, {key}, amount_used, recharge_amount, samples
+                FROM {table}_single_meter
+            ''', (DEFAULT_METER_ID,))
+            conn.execute(f'DROP TABLE {table}_single_meter')
+
+
+# (version, description, migrate(database_path)), applied in order. Each
+# migration must be safe to re-run: the version is only recorded once it
+# has completed, so an interrupted upgrade starts that step again.
+MIGRATIONS = [
+    (1, 'integer epoch timestamps', _add_epoch_timestamps),
+    (2, 'covering and partial query indexes', _add_query_indexes),
+    (3, 'compaction support', _prepare_compaction),
+    (4, 'per-meter readings and rollups', _add_meter_ids),
+]
+
+
+def run_migrations(database_path):
+    """Bring the schema up to the newest version in ``MIGRATIONS``.
+
+    Runs on every startup from ``init_db``. Returns the resulting version.
+    A database written by a newer release is left untouched.
+    """
+    with write_connection(database_path) as conn:
+        current_version = get_schema_version(conn)
+
+    latest_version = MIGRATIONS[-1][0]
+    if current_version > latest_version:
+        logger.warning(
+            f"Database schema version {current_version} is newer than this release "
+            f"supports ({latest_version}); skipping migrations"
+        )
+        return current_version
+
+    for version, description, migrate in MIGRATIONS:
+        if version <= current_version:
+            continue
+        started = time.perf_counter()
+        logger.info(f"Applying schema migration {version}: {description}")
+        migrate(database_path)
+        with write_connection(database_path) as conn:
+            conn.execute(f'PRAGMA user_version = {version}')
+            # Refresh planner statistics for the new indexes.
+            conn.execute('PRAGMA optimize')
+        current_version = version
+        logger.info(f"Schema migration {version} finished in {time.perf_counter() - started:.1f}s")
+
+    return current_version
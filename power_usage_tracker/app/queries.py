@@ -0,0 +1,78 @@
+"""SQL for the queries on the dashboard's hot paths.
+
+Each statement lives here so the function that runs it and the index check
+in ``query_plans`` share one copy; a change to a query is checked as written.
+Statements with ``{placeholders}`` or ``{values}`` are formatted with one
+group per requested day before use.
+"""
+
+LAST_RECORD_SQL = '''
+    SELECT timestamp, balance, present_load, amount_used, recharge_amount
+    FROM power_usage WHERE meter_id = ? ORDER BY ts_epoch DESC LIMIT 1
+'''
+
+DATA_VERSION_SQL = '''
+    SELECT MAX(id) FROM power_usage
+'''
+
+RECENT_READINGS_SQL = '''
+    SELECT ts_epoch, present_load, balance FROM power_usage
+    WHERE meter_id = ? ORDER BY ts_epoch DESC LIMIT ?
+'''
+
+RECENT_LOADS_SQL = '''
+    SELECT ts_epoch, present_load FROM power_usage
+    WHERE meter_id = ? AND ts_epoch > ?
+    ORDER BY ts_epoch
+    LIMIT ?
+'''
+
+RECENT_RECHARGES_SQL = '''
+    SELECT timestamp, recharge_amount
+    FROM power_usage
+    WHERE meter_id = ? AND recharge_amount > 0
+    ORDER BY ts_epoch DESC
+    LIMIT ?
+'''
+
+EXPORT_ROWS_SQL = '''
+    SELECT ts_epoch, balance, present_load, amount_used, recharge_amount, samples
+    FROM power_usage
+    WHERE meter_id = ? AND ts_epoch >= ? AND ts_epoch < ?
+    ORDER BY ts_epoch
+'''
+
+BUCKETED_AMOUNTS_SQL = '''
+    SELECT bucket_start / :step * :step AS bucket, SUM(amount_used)
+    FROM (
+        SELECT bucket_start, amount_used
+        FROM power_usage_minute
+        WHERE meter_id = :meter_id
+          AND bucket_start >= :first_minute AND bucket_start < :split
+          AND bucket_start <= :end
+        UNION ALL
+        SELECT bucket_start, amount_used
+        FROM power_usage_hour
+        WHERE meter_id = :meter_id
+          AND bucket_start >= :split AND bucket_start <= :end
+    )
+    GROUP BY bucket
+    ORDER BY bucket
+'''
+
+DAILY_AMOUNTS_SQL = '''
+    SELECT local_date, amount_used
+    FROM power_usage_daily
+    WHERE meter_id = ? AND local_date IN ({placeholders})
+'''
+
+DAILY_AMOUNTS_OTHER_TIMEZONE_SQL = '''
+    WITH days(local_date, start_epoch, end_epoch) AS (VALUES {values})
+    SELECT days.local_date, SUM(m.amount_used)
+    FROM days
+    JOIN power_usage_minute AS m
+      ON m.meter_id = ?
+     AND m.bucket_start >= days.start_epoch
+     AND m.bucket_start < days.end_epoch
+    GROUP BY days.local_date
+'''
@@ -0,0 +1,79 @@
+"""Confirm the dashboard's queries are answered from an index.
+
+Each entry runs the SQL (from ``queries``) of the function named in its key,
+with representative parameters. ``find_unindexed_queries`` runs ``EXPLAIN QUERY
+PLAN`` for every entry and reports the ones that fall back to a full table
+scan, e.g. after a migration dropped an index a query relied on.
+"""
+import logging
+import sqlite3
+import time
+
+from . import queries
+from .db import read_connection
+
+logger = logging.getLogger(__name__)
+
+DASHBOARD_QUERIES = {
+    'get_last_record': (queries.LAST_RECORD_SQL, ('default',)),
+    'get_data_version': (queries.DATA_VERSION_SQL, ()),
+    'load_recent_readings': (queries.RECENT_READINGS_SQL, ('default', 1024)),
+    'load_recent_loads': (queries.RECENT_LOADS_SQL, ('default', 0, 86400)),
+    'get_recent_recharges': (queries.RECENT_RECHARGES_SQL, ('default', 5)),
+    'iter_export_rows': (queries.EXPORT_ROWS_SQL, ('default', 0, 86400)),
+    'query_bucketed_amounts': (
+        queries.BUCKETED_AMOUNTS_SQL,
+        {'meter_id': 'default', 'step': 3600, 'first_minute': 0, 'split': 3600, 'end': 86400},
+    ),
+    'query_daily_amounts': (
+        queries.DAILY_AMOUNTS_SQL.format(placeholders='?, ?'),
+        ('default', '2025-01-01', '2025-01-02'),
+    ),
+    'query_daily_amounts_other_timezone': (
+        queries.DAILY_AMOUNTS_OTHER_TIMEZONE_SQL.format(values='(?, ?, ?)'),
+        ('2025-01-01', 0, 86400, 'default'),
+    ),
+}
+
+
+def explain(conn, sql, params):
+    """Return the ``detail`` column of each ``EXPLAIN QUERY PLAN`` row."""
+    return [row[3] for row in conn.execute(f'EXPLAIN QUERY PLAN {sql}', params)]
+
+
+def is_full_scan(detail):
+    # "SCAN t USING INDEX i" walks an index in order (used with LIMIT);
+    # subqueries, the VALUES list and constant rows are not stored tables.
+    if not detail.startswith('SCAN '):
+        return False
+    if 'INDEX' in detail or 'PRIMARY KEY' in detail:
+        return False
+    name = detail.split()[1]
+    return not name.startswith('(') and name not in ('days', 'CONSTANT')
+
+
+def find_unindexed_queries(database_path):
+    """Return ``{query_name: plan_details}`` for queries that scan a table."""
+    unindexed = {}
+    with read_connection(database_path) as conn:
+        for name, (sql, params) in DASHBOARD_QUERIES.items():
+            plan = explain(conn, sql, params)
+            if any(is_full_scan(detail) for detail in plan):
+                unindexed[name] = plan
+    return unindexed
+
+
+def check_query_plans(database_path):
+    """Log a warning for every dashboard query that is not index-backed."""
+    started = time.perf_counter()
+    try:
+        unindexed = find_unindexed_queries(database_path)
+    except sqlite3.Error as e:
+        logger.error(f"Database error checking query plans: {e}")
+        return False
+
+    for name, plan in unindexed.items():
+        logger.warning(f"Query {name} does not use an index: {'; '.join(plan)}")
+    logger.debug(f"Checked {len(DASHBOARD_QUERIES)} query plans in {(time.perf_counter() - started) * 1000:.1f} ms")
+    return not unindexed
+
@@ -0,0 +1,99 @@
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from functools import wraps
+
+import pytz
+from flask import Response, current_app, request
+
+RESPONSE_CACHE_SIZE = 128
+
+
+class ResponseCache:
+    """Small LRU of serialized JSON bodies tagged with the data version.
+
+    An entry is only served while the data version it was built from is still
+    current, so any stored row invalidates every cached chart payload at once.
+    """
+
+    def __init__(self, max_entries=RESPONSE_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, version):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != version:
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def put(self, key, version, body):
+        with self._lock:
+            self._entries[key] = (version, body)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+def cached_json_response(cache, version_for, slot_for):
+    """Serve a JSON view from ``cache`` with ETag/Last-Modified validation.
+
+    ``version_for(args)`` returns ``(data_version, updated_at)`` for the data
+    the response depends on: a version shared by every worker process (see
+    ``get_data_version``), or ``None`` to bypass the cache, and the epoch of
+    the latest change this process has seen, or ``None``. ``slot_for(args)`` returns ``(slot_key, slot_start_epoch)`` describing the
+    time window the response depends on besides stored data (for example the
+    current chart bucket), so payloads still roll over when a bucket closes
+    without new readings. Conditional requests that match are answered with
+    304 before the view runs any query.
+    """
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            version, updated_at = version_for(request.args)
+            if version is None:
+                return view(*args, **kwargs)
+            slot_key, slot_start_epoch = slot_for(request.args)
+            etag = f"{version}-{slot_key}"
+
+            modified_second = int(max(slot_start_epoch, updated_at or 0))
+            last_modified = datetime.fromtimestamp(modified_second, pytz.utc)
+
+            if request.if_none_match:
+                not_modified = request.if_none_match.contains(etag)
+            else:
+                not_modified = (
+                    request.if_modified_since is not None
+                    and last_modified <= request.if_modified_since
+                )
+
+            key = (request.endpoint, tuple(sorted(request.args.items(multi=True))), slot_key)
+            body = None if not_modified else cache.get(key, version)
+
+            if not not_modified and body is None:
+                response = current_app.make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+                body = response.get_data()
+                cache.put(key, version, body)
+
+            response = Response(
+                status=304 if not_modified else 200,
+                response=None if not_modified else body,
+                mimetype="application/json",
+            )
+            response.set_etag(etag)
+            # Last-Modified has one-second resolution: a change later in the
+            # same second would share it, so it is sent once that second ends.
+            if modified_second < int(time.time()):
+                response.last_modified = last_modified
+            response.headers["Cache-Control"] = "no-cache"
+            return response
+
+        return wrapper
+
+    return decorator
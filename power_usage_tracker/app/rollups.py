@@ -0,0 +1,276 @@
+import calendar
+import logging
+from datetime import datetime
+
+import pytz
+
+from .config import DEFAULT_METER_ID
+from .queries import BUCKETED_AMOUNTS_SQL, DAILY_AMOUNTS_OTHER_TIMEZONE_SQL, DAILY_AMOUNTS_SQL
+
+logger = logging.getLogger(__name__)
+
+# Local-day rollups are aligned to the same timezone the meter reports in.
+ROLLUP_TIMEZONE = "Asia/Kolkata"
+
+MINUTE_SECONDS = 60
+HOUR_SECONDS = 3600
+
+
+def init_rollup_tables(c):
+    """Create per-minute, per-hour and per-local-day rollup tables.
+
+    Minute and hour buckets are keyed by meter and their UTC start in epoch
+    seconds so any chart grouping can be answered with integer arithmetic;
+    daily rows are keyed by meter and the local calendar date in
+    ``ROLLUP_TIMEZONE``. The tables are clustered on that key (``WITHOUT
+    ROWID``) so a meter's range is one contiguous read.
+    """
+    for table in ("power_usage_minute", "power_usage_hour"):
+        c.execute(f'''
+            CREATE TABLE IF NOT EXISTS {table} (
+                meter_id TEXT NOT NULL,
+                bucket_start INTEGER NOT NULL,
+                amount_used REAL NOT NULL DEFAULT 0,
+                recharge_amount REAL NOT NULL DEFAULT 0,
+                samples INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (meter_id, bucket_start)
+            ) WITHOUT ROWID
+        ''')
+
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS power_usage_daily (
+            meter_id TEXT NOT NULL,
+            local_date TEXT NOT NULL,
+            amount_used REAL NOT NULL DEFAULT 0,
+            recharge_amount REAL NOT NULL DEFAULT 0,
+            samples INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (meter_id, local_date)
+        ) WITHOUT ROWID
+    ''')
+
+
+def to_epoch(timestamp_utc):
+    """Convert a naive or aware UTC datetime to integer epoch seconds."""
+    return calendar.timegm(timestamp_utc.utctimetuple())
+
+
+def local_date_for(epoch, timezone_name=ROLLUP_TIMEZONE):
+    """Return the local calendar date string for an epoch timestamp."""
+    timestamp_utc = datetime.fromtimestamp(epoch, pytz.utc)
+    return timestamp_utc.astimezone(pytz.timezone(timezone_name)).strftime("%Y-%m-%d")
+
+
+def apply_reading(c, epoch, amount_used, recharge_amount, meter_id=DEFAULT_METER_ID):
+    """Fold one stored reading into every rollup table.
+
+    Must run in the same transaction as the raw ``power_usage`` insert so the
+    rollups never drift from the rows they summarise.
+    """
+    values = (float(amount_used or 0), float(recharge_amount or 0))
+
+    for table, bucket_start in (
+        ("power_usage_minute", epoch - epoch % MINUTE_SECONDS),
+        ("power_usage_hour", epoch - epoch % HOUR_SECONDS),
+    ):
+        c.execute(f'''
+            INSERT INTO {table} (meter_id, bucket_start, amount_used, recharge_amount, samples)
+            VALUES (?, ?, ?, ?, 1)
+            ON CONFLICT(meter_id, bucket_start) DO UPDATE SET
+                amount_used = amount_used + excluded.amount_used,
+                recharge_amount = recharge_amount + excluded.recharge_amount,
+                samples = samples + 1
+        ''', (meter_id, bucket_start) + values)
+
+    c.execute('''
+        INSERT INTO power_usage_daily (meter_id, local_date, amount_used, recharge_amount, samples)
+        VALUES (?, ?, ?, ?, 1)
+        ON CONFLICT(meter_id, local_date) DO UPDATE SET
+            amount_used = amount_used + excluded.amount_used,
+            recharge_amount = recharge_amount + excluded.recharge_amount,
+            samples = samples + 1
+    ''', (meter_id, local_date_for(epoch)) + values)
+
+
+def apply_readings(c, readings, meter_id=DEFAULT_METER_ID):
+    """Fold many ``(epoch, amount_used, recharge_amount)`` readings at once.
+
+    Bulk counterpart of ``apply_reading`` for imports: readings are summed
+    per bucket in memory first, so each touched bucket costs one upsert. A
+    reading may carry a fourth ``samples`` element (default 1): the number of
+    raw readings it stands for, or 0 for a correction to one already counted.
+    """
+    minutes = {}
+    for epoch, amount_used, recharge_amount, *samples in readings:
+        totals = minutes.setdefault(epoch - epoch % MINUTE_SECONDS, [0.0, 0.0, 0])
+        totals[0] += float(amount_used or 0)
+        totals[1] += float(recharge_amount or 0)
+        totals[2] += samples[0] if samples else 1
+
+    hours = {}
+    days = {}
+    local_dates = {}
+    for bucket_start, (amount_used, recharge_amount, samples) in minutes.items():
+        # Zone offsets are whole quarter hours, so the local date is constant
+        # within each 15-minute block.
+        block = bucket_start - bucket_start % 900
+        local_date = local_dates.get(block)
+        if local_date is None:
+            local_date = local_dates[block] = local_date_for(block)
+        for buckets, key in ((hours, bucket_start - bucket_start % HOUR_SECONDS), (days, local_date)):
+            totals = buckets.setdefault(key, [0.0, 0.0, 0])
+            totals[0] += amount_used
+            totals[1] += recharge_amount
+            totals[2] += samples
+
+    for table, key_column, buckets in (
+        ("power_usage_minute", "bucket_start", minutes),
+        ("power_usage_hour", "bucket_start", hours),
+        ("power_usage_daily", "local_date", days),
+    ):
+        c.executemany(
+            f'''
+            INSERT INTO {table} (meter_id, {key_column}, amount_used, recharge_amount, samples)
+            VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT(meter_id, {key_column}) DO UPDATE SET
+                amount_used = amount_used + excluded.amount_used,
+                recharge_amount = recharge_amount + excluded.recharge_amount,
+                samples = samples + excluded.samples
+            ''',
+            [(meter_id, key) + tuple(totals) for key, totals in buckets.items()],
+        )
+
+
+def history_version_key(meter_id=DEFAULT_METER_ID):
+    return f'history_version:{meter_id}'
+
+
+def mark_history_rewritten(c, meter_id=DEFAULT_METER_ID):
+    """Bump ``meter_id``'s history version, in the transaction that rewrote past rows.
+
+    Imports and compaction call this so that caches of closed-day totals, in
+    any process, know to read those days again.
+    """
+    c.execute(
+        '''
+        INSERT INTO app_metadata (key, value) VALUES (?, '1')
+        ON CONFLICT(key) DO UPDATE SET value = CAST(CAST(value AS INTEGER) + 1 AS TEXT)
+        ''',
+        (history_version_key(meter_id),)
+    )
+
+
+def get_history_version(c, meter_id=DEFAULT_METER_ID):
+    row = c.execute(
+        'SELECT value FROM app_metadata WHERE key = ?', (history_version_key(meter_id),)
+    ).fetchone()
+    return int(row[0]) if row else 0
+
+
+def backfill_rollups(c):
+    """Populate empty rollup tables from existing raw rows (one-off).
+
+    Runs only when the minute rollup is empty but ``power_usage`` is not, i.e.
+    the first start after upgrading an existing database.
+    """
+    if c.execute("SELECT 1 FROM power_usage_minute LIMIT 1").fetchone():
+        return
+    if not c.execute("SELECT 1 FROM power_usage LIMIT 1").fetchone():
+        return
+
+    logger.info("Backfilling usage rollup tables from existing readings")
+
+    c.execute('''
+        INSERT INTO power_usage_minute (meter_id, bucket_start, amount_used, recharge_amount, samples)
+        SELECT
+            meter_id,
+            ts_epoch / 60 * 60 AS bucket,
+            SUM(COALESCE(amount_used, 0)),
+            SUM(COALESCE(recharge_amount, 0)),
+            SUM(samples)
+        FROM power_usage
+        GROUP BY meter_id, bucket
+    ''')
+
+    c.execute('''
+        INSERT INTO power_usage_hour (meter_id, bucket_start, amount_used, recharge_amount, samples)
+        SELECT meter_id, bucket_start / 3600 * 3600 AS bucket,
+               SUM(amount_used), SUM(recharge_amount), SUM(samples)
+        FROM power_usage_minute
+        GROUP BY meter_id, bucket
+    ''')
+
+    # Local midnight is not hour-aligned for every zone (Asia/Kolkata is
+    # UTC+05:30), so daily totals are folded from minute buckets in Python.
+    daily = {}
+    for meter_id, bucket_start, amount_used, recharge_amount, samples in c.execute(
+        "SELECT meter_id, bucket_start, amount_used, recharge_amount, samples FROM power_usage_minute"
+    ).fetchall():
+        key = (meter_id, local_date_for(bucket_start))
+        totals = daily.setdefault(key, [0.0, 0.0, 0])
+        totals[0] += amount_used
+        totals[1] += recharge_amount
+        totals[2] += samples
+
+    c.executemany(
+        '''
+        INSERT INTO power_usage_daily (meter_id, local_date, amount_used, recharge_amount, samples)
+        VALUES (?, ?, ?, ?, ?)
+        ''',
+        [key + tuple(totals) for key, totals in daily.items()],
+    )
+
+
+def query_bucketed_amounts(c, start_epoch, end_epoch, group_minutes, meter_id=DEFAULT_METER_ID):
+    """Return ``(bucket_start_epoch, amount_used)`` rows for any grouping.
+
+    Buckets are aligned to multiples of ``group_minutes`` since the epoch, as
+    the raw-table query did. Whole hours are read from the hourly rollup when
+    the grouping is a multiple of an hour; the leading partial hour and every
+    other grouping are served from minute rollups.
+    """
+    step = group_minutes * MINUTE_SECONDS
+    first_minute = start_epoch - start_epoch % MINUTE_SECONDS
+
+    if step % HOUR_SECONDS == 0:
+        split = -(-start_epoch // HOUR_SECONDS) * HOUR_SECONDS
+    else:
+        split = end_epoch + 1
+
+    c.execute(
+        BUCKETED_AMOUNTS_SQL,
+        {
+            "meter_id": meter_id,
+            "step": step,
+            "first_minute": first_minute,
+            "split": split,
+            "end": end_epoch,
+        },
+    )
+    return c.fetchall()
+
+
+def query_daily_amounts(c, day_windows, timezone_name=ROLLUP_TIMEZONE, meter_id=DEFAULT_METER_ID):
+    """Return ``{local_date: amount_used}`` for local-day windows in one query.
+
+    ``day_windows`` is a list of ``(local_date, start_epoch, end_epoch)``
+    half-open ranges. Days in ``ROLLUP_TIMEZONE`` are read straight from the
+    daily rollup; other zones join the windows against minute rollups so
+    DST-shifted boundaries are still honoured.
+    """
+    if not day_windows:
+        return {}
+
+    if timezone_name == ROLLUP_TIMEZONE:
+        placeholders = ", ".join("?" for _ in day_windows)
+        c.execute(
+            DAILY_AMOUNTS_SQL.format(placeholders=placeholders),
+            [meter_id] + [local_date for local_date, _, _ in day_windows],
+        )
+    else:
+        values = ", ".join("(?, ?, ?)" for _ in day_windows)
+        c.execute(
+            DAILY_AMOUNTS_OTHER_TIMEZONE_SQL.format(values=values),
+            [value for window in day_windows for value in window] + [meter_id],
+        )
+
+    return {local_date: float(amount or 0) for local_date, amount in c.fetchall()}
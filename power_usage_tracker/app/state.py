@@ -1,7 +1,29 @@
-from datetime import datetime
+from datetime import date, datetime
+from .broadcaster import Broadcaster
+from .detectors import AnomalyDetectors
+from .forecast import BurnRateForecast
+from .live_buffer import ReadingRingBuffer
+
+# Detection state that is persisted with every stored reading and restored at
+# startup, so DG tracking survives a restart. The anomaly detectors are
+# rebuilt from recent readings instead (see ``AnomalyDetectors.warm_up``).
+# The forecast statistics are saved alongside under ``'forecast'``.
+SNAPSHOT_FIELDS = (
+    'last_low_balance_alert_date',
+    'last_dg_value',
+    'last_eb_value',
+    'last_balance_value',
+    'last_updated_timestamp',
+    'is_dg_on',
+    'dg_state_changed_at',
+    'dg_unchanged_counter',
+    'dg_session_start_value',
+)
+DATETIME_FIELDS = ('last_updated_timestamp', 'dg_state_changed_at')
+DATE_FIELDS = ('last_low_balance_alert_date',)
 
 class State:
-    def __init__(self):
+    def __init__(self, detectors=None):
         self.last_low_balance_alert_date = None
         self.last_dg_value = None
         self.last_eb_value = None
@@ -10,5 +32,37 @@ class State:
         self.is_dg_on = False
         self.dg_state_changed_at = None
         self.dg_unchanged_counter = 0
-        self.recent_loads = []
-        self.dg_session_start_value = None
\ No newline at end of file
+        self.detectors = detectors or AnomalyDetectors()
+        self.dg_session_start_value = None
+        self.forecast = BurnRateForecast()
+        self.last_record = None
+        self.recent_readings = ReadingRingBuffer()
+        self.live_updates = Broadcaster()
+        self.data_updated_at = None
+        # The serialized snapshot last handed off for saving.
+        self.saved_snapshot = None
+
+    def snapshot(self):
+        """Return the ``SNAPSHOT_FIELDS`` as a JSON-serialisable dict."""
+        snapshot = {}
+        for field in SNAPSHOT_FIELDS:
+            value = getattr(self, field)
+            if isinstance(value, (date, datetime)):
+                value = value.isoformat()
+            snapshot[field] = value
+        snapshot['forecast'] = self.forecast.snapshot()
+        return snapshot
+
+    def restore(self, snapshot):
+        """Load fields saved by ``snapshot``; unknown or missing keys are ignored."""
+        for field in SNAPSHOT_FIELDS:
+            if field not in snapshot:
+                continue
+            value = snapshot[field]
+            if value is not None and field in DATETIME_FIELDS:
+                value = datetime.fromisoformat(value)
+            elif value is not None and field in DATE_FIELDS:
+                value = date.fromisoformat(value)
+            setattr(self, field, value)
+        if 'forecast' in snapshot:
+            self.forecast.restore(snapshot['forecast'])
@@ -1,19 +1,250 @@
+import logging
+import sqlite3
+import time
+
 import requests
 
-def send_telegram_message(message, config):
-    """Sends a message to the configured Telegram chat."""
-    if not config.TELEGRAM_BOT_TOKEN or not config.TELEGRAM_CHAT_ID:
-        print("Telegram bot token or chat ID not configured. Skipping notification.")
-        return
+from .db import read_connection, write_connection
+from .metrics import TELEGRAM_SENDS
+
+logger = logging.getLogger(__name__)
+
+TELEGRAM_MESSAGE_LIMIT = 4096
+OUTBOX_BATCH_SIZE = 20
+OUTBOX_MAX_ATTEMPTS = 10
+# Telegram allows roughly one message per second to a single chat.
+MIN_SEND_INTERVAL_SECONDS = 1.0
+SEND_TIMEOUT = (3.05, 10)
+# Returned by send_telegram_message when Telegram refuses the message itself.
+REJECTED = 'rejected'
+# Returned when Telegram refuses the bot or the chat: a bad or revoked token,
+# a blocked bot or an unknown chat. Queued messages wait for the fix.
+UNDELIVERABLE = 'undeliverable'
+UNDELIVERABLE_RETRY_SECONDS = 600
+# ``description`` fragments of 400 responses caused by the message text.
+MESSAGE_ERRORS = (
+    "can't parse entities",
+    "message is too long",
+    "message text is empty",
+    "text must be non-empty",
+)
+
+_session = requests.Session()
+_last_sent_at = 0.0
+
+
+def is_telegram_configured(config):
+    return bool(config.TELEGRAM_BOT_TOKEN and config.TELEGRAM_CHAT_ID)
+
+
+def init_outbox_table(c):
+    """Create the durable queue of pending Telegram messages."""
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS telegram_outbox (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            message TEXT NOT NULL,
+            created_at REAL NOT NULL,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            next_attempt_at REAL NOT NULL
+        )
+    ''')
+
+
+def send_telegram_message(message, config, parse_mode="Markdown"):
+    """Send one message to the configured chat.
+
+    Returns ``None`` on success, ``REJECTED`` when Telegram refuses this
+    message (for example Markdown it cannot parse), which retrying will not
+    fix, ``UNDELIVERABLE`` for any other 4xx except 429 (the token or chat is
+    wrong, so no message can be sent until the configuration is fixed), or
+    the number of seconds to wait before retrying (Telegram's
+    ``retry_after`` when rate limited).
+    """
+    if not is_telegram_configured(config):
+        logger.info("Telegram bot token or chat ID not configured. Skipping notification.")
+        return None
 
     url = f"https://api.telegram.org/bot{config.TELEGRAM_BOT_TOKEN}/sendMessage"
     payload = {
         "chat_id": config.TELEGRAM_CHAT_ID,
         "text": message,
-        "parse_mode": "Markdown"
     }
+    if parse_mode:
+        payload["parse_mode"] = parse_mode
     try:
-        response = requests.post(url, json=payload)
+        response = _session.post(url, json=payload, timeout=SEND_TIMEOUT)
+        if response.status_code == 429:
+            retry_after = response.json().get('parameters', {}).get('retry_after', 30)
+            logger.warning(f"Telegram rate limit hit; retrying after {retry_after}s")
+            return float(retry_after)
+        if 400 <= response.status_code < 500:
+            try:
+                description = str(response.json().get('description', ''))
+            except ValueError:
+                description = response.text[:200]
+            if response.status_code == 400 and any(
+                error in description.lower() for error in MESSAGE_ERRORS
+            ):
+                logger.warning(f"Telegram rejected message: {description}")
+                return REJECTED
+            logger.error(
+                f"Telegram refused the bot or chat ({response.status_code} {description}); "
+                f"check TELEGRAM_BOT_TOKEN and TELEGRAM_CHAT_ID"
+            )
+            return UNDELIVERABLE
         response.raise_for_status()
-    except requests.exceptions.RequestException as e:
-        print(f"Failed to send Telegram message: {e}")
\ No newline at end of file
+        return None
+    except (requests.exceptions.RequestException, ValueError) as e:
+        logger.error(f"Failed to send Telegram message: {e}")
+        return 0.0
+
+
+def enqueue_telegram_message(message, config):
+    """Queue a message for background delivery; never blocks on Telegram."""
+    if not is_telegram_configured(config):
+        logger.info("Telegram bot token or chat ID not configured. Skipping notification.")
+        return
+
+    now = time.time()
+    try:
+        with write_connection(config.DATABASE) as conn:
+            conn.execute(
+                'INSERT INTO telegram_outbox (message, created_at, next_attempt_at) VALUES (?, ?, ?)',
+                (message, now, now)
+            )
+    except sqlite3.Error as e:
+        logger.error(f"Database error queueing Telegram message: {e}")
+
+
+def _coalesce(rows):
+    """Pack as many queued messages as fit into one Telegram message."""
+    batch_ids = []
+    parts = []
+    length = 0
+    for row_id, message in rows:
+        added = len(message) + (2 if parts else 0)
+        if parts and length + added > TELEGRAM_MESSAGE_LIMIT:
+            break
+        batch_ids.append(row_id)
+        parts.append(message)
+        length += added
+    return batch_ids, "\n\n".join(parts)[:TELEGRAM_MESSAGE_LIMIT]
+
+
+def _send_paced(message, config):
+    """Send with Markdown, falling back to plain text if Telegram rejects it.
+
+    Waits out ``MIN_SEND_INTERVAL_SECONDS`` since the previous send first.
+    Returns what ``send_telegram_message`` returned for the last attempt.
+    """
+    global _last_sent_at
+
+    for parse_mode in ("Markdown", None):
+        wait = _last_sent_at + MIN_SEND_INTERVAL_SECONDS - time.time()
+        if wait > 0:
+            time.sleep(wait)
+        result = send_telegram_message(message, config, parse_mode)
+        _last_sent_at = time.time()
+        if result is not REJECTED:
+            break
+    TELEGRAM_SENDS.labels(
+        'sent' if result is None else result if result in (REJECTED, UNDELIVERABLE) else 'retry'
+    ).inc()
+    return result
+
+
+def _delete(config, ids):
+    placeholders = ", ".join("?" for _ in ids)
+    with write_connection(config.DATABASE) as conn:
+        conn.execute(f'DELETE FROM telegram_outbox WHERE id IN ({placeholders})', ids)
+
+
+def _reschedule(config, ids, retry_after):
+    placeholders = ", ".join("?" for _ in ids)
+    with write_connection(config.DATABASE) as conn:
+        if retry_after is UNDELIVERABLE:
+            # Not the messages' fault, so the attempt does not count.
+            conn.execute(
+                f'UPDATE telegram_outbox SET next_attempt_at = ? WHERE id IN ({placeholders})',
+                [time.time() + UNDELIVERABLE_RETRY_SECONDS] + ids
+            )
+            return
+        conn.execute(
+            f'''
+            UPDATE telegram_outbox
+            SET attempts = attempts + 1,
+                next_attempt_at = ? + MAX(?, MIN(600, 5 * (1 << attempts)))
+            WHERE id IN ({placeholders})
+            ''',
+            [time.time(), retry_after] + ids
+        )
+        dropped = conn.execute(
+            'DELETE FROM telegram_outbox WHERE attempts >= ?', (OUTBOX_MAX_ATTEMPTS,)
+        ).rowcount
+        if dropped:
+            logger.error(f"Dropped {dropped} Telegram message(s) after {OUTBOX_MAX_ATTEMPTS} failed attempts")
+
+
+def deliver_outbox(config):
+    """Send due outbox messages, coalescing a burst into a single message.
+
+    Runs from the scheduler. The queue lives in SQLite, so alerts raised just
+    before a restart are delivered once the process is back. If Telegram
+    rejects a coalesced message outright, its messages are sent one by one
+    so only the offending one is dropped.
+    """
+    if not is_telegram_configured(config):
+        return
+    if time.time() - _last_sent_at < MIN_SEND_INTERVAL_SECONDS:
+        return
+
+    try:
+        with read_connection(config.DATABASE) as conn:
+            rows = conn.execute(
+                '''
+                SELECT id, message FROM telegram_outbox
+                WHERE next_attempt_at <= ?
+                ORDER BY id
+                LIMIT ?
+                ''',
+                (time.time(), OUTBOX_BATCH_SIZE)
+            ).fetchall()
+    except sqlite3.Error as e:
+        logger.error(f"Database error reading Telegram outbox: {e}")
+        return
+
+    if not rows:
+        return
+
+    batch_ids, text = _coalesce(rows)
+    result = _send_paced(text, config)
+    if result is REJECTED and len(batch_ids) > 1:
+        logger.warning(f"Telegram rejected {len(batch_ids)} coalesced messages; sending them one by one")
+        messages = dict(rows)
+        pending = list(batch_ids)
+        while pending:
+            row_id = pending[0]
+            result = _send_paced(messages[row_id], config)
+            if result is not None and result is not REJECTED:
+                break
+            if result is REJECTED:
+                logger.error(f"Dropping Telegram message {row_id} that Telegram refused")
+            try:
+                _delete(config, [row_id])
+            except sqlite3.Error as e:
+                logger.error(f"Database error updating Telegram outbox: {e}")
+                return
+            pending.pop(0)
+        batch_ids = pending
+        if not batch_ids:
+            return
+    elif result is REJECTED:
+        logger.error(f"Dropping Telegram message {batch_ids[0]} that Telegram refused")
+
+    try:
+        if result is None or result is REJECTED:
+            _delete(config, batch_ids)
+        else:
+            _reschedule(config, batch_ids, result)
+    except sqlite3.Error as e:
+        logger.error(f"Database error updating Telegram outbox: {e}")
@@ -1,12 +1,48 @@
-from flask import Blueprint, render_template, jsonify, request
+from flask import Blueprint, Response, abort, render_template, jsonify, request
 import sqlite3
+from array import array
 from datetime import datetime, timedelta
 import pytz
 import logging
+import math
+import operator
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from ..broadcaster import format_sse
+from ..config import DEFAULT_METER_ID
+from ..data_manager import MAX_READING_AGE_SECONDS, build_live_update, get_data_version
+from ..db import read_connection
+from ..export import (
+    EXPORT_FORMATS,
+    acquire_export_slot,
+    export_stream,
+    release_export_slot,
+)
+from ..metrics import SQL_QUERY_SECONDS
+from ..queries import RECENT_RECHARGES_SQL
+from ..response_cache import ResponseCache, cached_json_response
+from ..rollups import (
+    ROLLUP_TIMEZONE,
+    get_history_version,
+    query_bucketed_amounts,
+    query_daily_amounts,
+    to_epoch,
+)
 
 logger = logging.getLogger(__name__)
 
-LOCAL_DAILY_USAGE_TIMEZONE = "Asia/Kolkata"
+LOCAL_DAILY_USAGE_TIMEZONE = ROLLUP_TIMEZONE
+
+# (database_path, meter_id, timezone_name, local_date) -> (history version,
+# amount used on a closed day), least recently used first.
+_closed_day_totals = OrderedDict()
+_closed_day_totals_lock = threading.Lock()
+# A month of days for a handful of meters.
+CLOSED_DAY_CACHE_SIZE = 256
+# Slack on top of the ingest lag for follower sync and scheduling delays.
+CLOSED_DAY_SETTLE_MARGIN_SECONDS = 60
 
 
 def format_duration(delta):
@@ -34,26 +70,19 @@ def build_dg_status(state):
     return dg_status
 
 
-def get_recent_recharges(database_path, limit=5):
+def get_recent_recharges(database_path, limit=5, meter_id=DEFAULT_METER_ID):
     """Fetch recent recharge records from database"""
-    conn = None
     try:
-        conn = sqlite3.connect(database_path)
-        c = conn.cursor()
-
-        # Query for recent recharges (where recharge_amount > 0)
-        c.execute(
-            """
-            SELECT timestamp, recharge_amount
-            FROM power_usage
-            WHERE recharge_amount > 0
-            ORDER BY timestamp DESC
-            LIMIT ?
-        """,
-            (limit,),
-        )
+        with SQL_QUERY_SECONDS.labels("recent_recharges").time(), read_connection(
+            database_path
+        ) as conn:
+            c = conn.cursor()
+
+            # Query for recent recharges (where recharge_amount > 0)
+            c.execute(RECENT_RECHARGES_SQL, (meter_id, limit))
+
+            records = c.fetchall()
 
-        records = c.fetchall()
         return [
             {"timestamp": record[0], "amount": float(record[1])} for record in records
         ]
@@ -61,148 +90,91 @@ def get_recent_recharges(database_path, limit=5):
     except sqlite3.Error as e:
         logger.error(f"Database error fetching recharges: {e}")
         return []
-    finally:
-        if conn:
-            conn.close()
 
 
-def get_latest_power_snapshot(database_path):
-    """Fetch latest power row from DB for lightweight live UI updates."""
-    conn = None
-    try:
-        conn = sqlite3.connect(database_path)
-        c = conn.cursor()
-        c.execute("""
-            SELECT timestamp, present_load, balance
-            FROM power_usage
-            ORDER BY timestamp DESC
-            LIMIT 1
-        """)
-        record = c.fetchone()
-        if not record:
-            return None
-
-        timestamp_utc = datetime.fromisoformat(record[0]).replace(tzinfo=pytz.utc)
-        return {
-            "timestamp": timestamp_utc,
-            "present_load": float(record[1]),
-            "balance": float(record[2]),
-        }
-    except (sqlite3.Error, TypeError, ValueError) as e:
-        logger.error(f"Database error fetching latest power snapshot: {e}")
+def get_latest_power_snapshot(readings):
+    """Return the newest buffered reading for lightweight live UI updates."""
+    latest = readings.latest()
+    if not latest:
         return None
-    finally:
-        if conn:
-            conn.close()
 
+    timestamp_epoch, present_load, balance = latest
+    return {
+        "timestamp": datetime.fromtimestamp(timestamp_epoch, pytz.utc),
+        "present_load": present_load,
+        "balance": balance,
+    }
 
-def get_recent_present_loads(database_path, minutes=15, limit=180):
-    """Fetch recent present-load values for the live sparkline."""
-    conn = None
-    try:
-        conn = sqlite3.connect(database_path)
-        c = conn.cursor()
-
-        now_utc = datetime.utcnow().replace(tzinfo=pytz.utc)
-        window_start_utc = now_utc - timedelta(minutes=minutes)
-
-        c.execute(
-            """
-            SELECT timestamp, present_load
-            FROM power_usage
-            WHERE timestamp >= ?
-            ORDER BY timestamp ASC
-            LIMIT ?
-            """,
-            (window_start_utc.replace(tzinfo=None), limit),
-        )
-        records = c.fetchall()
 
-        points = []
-        for timestamp_str, present_load in records:
-            try:
-                timestamp_utc = datetime.fromisoformat(timestamp_str).replace(
-                    tzinfo=pytz.utc
-                )
-                points.append(
-                    {
-                        "timestamp": timestamp_utc.isoformat(),
-                        "present_load_kw": float(present_load),
-                    }
-                )
-            except (TypeError, ValueError):
-                continue
+def get_recent_present_loads(readings, minutes=15, limit=180):
+    """Return buffered present-load values for the live sparkline."""
+    now_utc = datetime.utcnow().replace(tzinfo=pytz.utc)
+    window_start_utc = now_utc - timedelta(minutes=minutes)
 
-        return points
-    except sqlite3.Error as e:
-        logger.error(f"Database error fetching recent present loads: {e}")
-        return []
-    finally:
-        if conn:
-            conn.close()
+    return [
+        {
+            "timestamp": datetime.fromtimestamp(timestamp_epoch, pytz.utc).isoformat(),
+            "present_load_kw": present_load,
+        }
+        for timestamp_epoch, present_load in readings.since(
+            to_epoch(window_start_utc), limit
+        )
+    ]
 
 
 def get_bucketed_amount_usage(
-    database_path, interval_start_utc, interval_end_utc, group_minutes
+    database_path,
+    interval_start_utc,
+    interval_end_utc,
+    group_minutes,
+    meter_id=DEFAULT_METER_ID,
 ):
     """Fetch grouped amount-used rows for a UTC interval.
 
-    Drops the trailing in-progress bucket so chart endpoints don't show an
+    Served entirely from the minute/hour rollup tables, so the cost depends
+    on the number of buckets rather than the number of raw readings. Drops
+    the trailing in-progress bucket so chart endpoints don't show an
     artificial dip at the end of the series.
     """
-    conn = None
     try:
-        conn = sqlite3.connect(database_path)
-        c = conn.cursor()
-        c.execute(
-            """
-            SELECT
-                strftime('%Y-%m-%d %H:%M', timestamp, '-' ||
-                    (strftime('%s', timestamp) % (? * 60)) || ' seconds') AS bucket,
-                SUM(amount_used) AS total_amount_used
-            FROM power_usage
-            WHERE timestamp >= ?
-              AND timestamp <= ?
-            GROUP BY bucket
-            ORDER BY bucket
-            """,
-            (
-                group_minutes,
-                interval_start_utc.replace(tzinfo=None),
-                interval_end_utc.replace(tzinfo=None),
-            ),
-        )
-
-        records = c.fetchall()
-        parsed_records = []
+        start_epoch = to_epoch(interval_start_utc)
+        end_epoch = to_epoch(interval_end_utc)
+        step = group_minutes * 60
+
+        with SQL_QUERY_SECONDS.labels("bucketed_amounts").time(), read_connection(
+            database_path
+        ) as conn:
+            records = query_bucketed_amounts(
+                conn.cursor(), start_epoch, end_epoch, group_minutes, meter_id
+            )
 
-        for bucket_str, total_amount_used in records:
-            try:
-                bucket_time = datetime.strptime(bucket_str, "%Y-%m-%d %H:%M")
-                bucket_end_time = bucket_time + timedelta(minutes=group_minutes)
-                if bucket_end_time > interval_end_utc.replace(tzinfo=None):
-                    continue
-                parsed_records.append((bucket_time, float(total_amount_used or 0)))
-            except (TypeError, ValueError):
-                continue
-
-        return parsed_records
+        return [
+            (datetime.utcfromtimestamp(bucket), float(total_amount_used or 0))
+            for bucket, total_amount_used in records
+            if bucket + step <= end_epoch
+        ]
     except sqlite3.Error as e:
         logger.error(f"Database error fetching bucketed amount usage: {e}")
         return []
-    finally:
-        if conn:
-            conn.close()
 
 
 def get_daily_amount_usage(
-    database_path, days=7, timezone_name=LOCAL_DAILY_USAGE_TIMEZONE
+    database_path,
+    days=7,
+    timezone_name=LOCAL_DAILY_USAGE_TIMEZONE,
+    meter_id=DEFAULT_METER_ID,
+    settle_seconds=0,
 ):
     """Fetch today-so-far plus previous local-day amount-used totals.
 
-    Database timestamps are stored as naive UTC values. Daily windows are
-    aligned to local midnight in ``timezone_name`` and converted to UTC for
-    indexed half-open range queries.
+    Daily windows are aligned to local midnight in ``timezone_name``. Totals
+    for completed days are settled once ``settle_seconds`` (the longest a
+    reading can take to be committed) have passed after midnight, and after
+    that change only when an import or compaction rewrites history, which
+    bumps the meter's history version. They are memoized per database, meter,
+    zone and date together with that version, in an LRU of
+    ``CLOSED_DAY_CACHE_SIZE`` days; each call only
+    queries today plus any uncached days, all in a single grouped rollup query.
     """
     timezone = pytz.timezone(timezone_name)
     now_local = datetime.now(timezone)
@@ -210,50 +182,229 @@ def get_daily_amount_usage(
         datetime(now_local.year, now_local.month, now_local.day)
     )
 
-    conn = None
+    day_starts = [
+        timezone.normalize(today_start_local - timedelta(days=day_offset))
+        for day_offset in range(days - 1, -1, -1)
+    ]
+    totals = {}
+
+    try:
+        with SQL_QUERY_SECONDS.labels("daily_amounts").time(), read_connection(
+            database_path
+        ) as conn:
+            c = conn.cursor()
+            history_version = get_history_version(c, meter_id)
+            pending = []
+            with _closed_day_totals_lock:
+                for day_start_local in day_starts:
+                    date_str = day_start_local.strftime("%Y-%m-%d")
+                    key = (database_path, meter_id, timezone_name, date_str)
+                    cached = _closed_day_totals.get(key)
+                    if (
+                        cached is not None
+                        and cached[0] == history_version
+                        and day_start_local != today_start_local
+                    ):
+                        _closed_day_totals.move_to_end(key)
+                        totals[date_str] = cached[1]
+                        continue
+                    pending.append(day_start_local)
+
+            day_windows = []
+            for day_start_local in pending:
+                # Localize the next calendar midnight rather than adding 24h so
+                # days spanning a DST change keep their true length.
+                next_day = day_start_local.date() + timedelta(days=1)
+                next_day_start_local = timezone.localize(
+                    datetime(next_day.year, next_day.month, next_day.day)
+                )
+                day_windows.append(
+                    (
+                        day_start_local.strftime("%Y-%m-%d"),
+                        to_epoch(day_start_local),
+                        to_epoch(next_day_start_local),
+                    )
+                )
+            fetched = query_daily_amounts(c, day_windows, timezone_name, meter_id)
+    except sqlite3.Error as e:
+        logger.error(f"Database error fetching daily amount usage: {e}")
+        return []
+
+    today_str = today_start_local.strftime("%Y-%m-%d")
+    settled_before = time.time() - settle_seconds
+    with _closed_day_totals_lock:
+        for date_str, _, end_epoch in day_windows:
+            totals[date_str] = fetched.get(date_str, 0.0)
+            if date_str != today_str and end_epoch <= settled_before:
+                key = (database_path, meter_id, timezone_name, date_str)
+                _closed_day_totals[key] = (history_version, totals[date_str])
+                _closed_day_totals.move_to_end(key)
+        while len(_closed_day_totals) > CLOSED_DAY_CACHE_SIZE:
+            _closed_day_totals.popitem(last=False)
+
+    return [
+        {
+            "date": day_start_local.strftime("%Y-%m-%d"),
+            "label": day_start_local.strftime("%a"),
+            "display_date": day_start_local.strftime("%a, %d %b"),
+            "amount_used": totals[day_start_local.strftime("%Y-%m-%d")],
+            "is_today": day_start_local == today_start_local,
+        }
+        for day_start_local in day_starts
+    ]
+
+
+def get_compare_series(
+    database_path,
+    interval_start_utc,
+    interval_end_utc,
+    group_minutes,
+    compare_days,
+    meter_id=DEFAULT_METER_ID,
+):
+    """Average each current bucket with the same bucket on previous days.
+
+    Reads the current window and the ``compare_days`` before it in a single
+    rollup scan into dense arrays indexed by bucket number. Viewed with a
+    stride of one day's worth of buckets, that array is a day-by-bucket
+    matrix, so the per-bucket sums and sample counts over the previous days
+    are differences of prefix sums taken down each column. Both the prefix
+    sums and the window differences are computed as whole-row ``map`` passes.
+
+    Returns ``([(bucket_epoch, avg_amount_used, sample_count), ...],
+    days_available)`` for buckets that have data in the current window.
+    """
+    step = group_minutes * 60
+    start_epoch = to_epoch(interval_start_utc)
+    end_epoch = to_epoch(interval_end_utc)
+    first_current = start_epoch // step * step
+    # Only complete buckets count, matching get_bucketed_amount_usage.
+    last_bucket = (end_epoch - step) // step * step
+
+    # A day offset only lines up with bucket boundaries when it is a multiple
+    # of ``day_multiple`` days; other offsets can never match a bucket.
+    day_multiple = step // math.gcd(step, 86400)
+    stride = day_multiple * 86400 // step
+    offsets = compare_days // day_multiple
+    base = first_current - (offsets + 1) * stride * step
+
     try:
-        conn = sqlite3.connect(database_path)
-        c = conn.cursor()
-
-        rows = []
-        for day_offset in range(days - 1, -1, -1):
-            day_start_local = today_start_local - timedelta(days=day_offset)
-            next_day_start_local = day_start_local + timedelta(days=1)
-            day_end_local = now_local if day_offset == 0 else next_day_start_local
-
-            day_start_utc = day_start_local.astimezone(pytz.utc).replace(tzinfo=None)
-            day_end_utc = day_end_local.astimezone(pytz.utc).replace(tzinfo=None)
-            day_start_db = day_start_utc.strftime("%Y-%m-%d %H:%M:%S")
-            day_end_db = day_end_utc.strftime("%Y-%m-%d %H:%M:%S")
-
-            c.execute(
-                """
-                SELECT COALESCE(SUM(amount_used), 0)
-                FROM power_usage
-                WHERE timestamp >= ?
-                  AND timestamp < ?
-                """,
-                (day_start_db, day_end_db),
+        with SQL_QUERY_SECONDS.labels("compare_series").time(), read_connection(
+            database_path
+        ) as conn:
+            records = query_bucketed_amounts(
+                conn.cursor(),
+                start_epoch - compare_days * 86400,
+                end_epoch,
+                group_minutes,
+                meter_id,
             )
-            total_amount_used = c.fetchone()[0] or 0
+    except sqlite3.Error as e:
+        logger.error(f"Database error fetching comparison buckets: {e}")
+        return [], 0
+
+    current_start = (first_current - base) // step
+    size = max((last_bucket - base) // step + 1, current_start)
+    values = array("d", bytes(8 * size))
+    present = bytearray(size)
+    for bucket, amount in records:
+        if base <= bucket <= last_bucket:
+            index = (bucket - base) // step
+            values[index] = float(amount or 0)
+            present[index] = 1
+
+    current_present = present[current_start:]
+    current_len = len(current_present)
+
+    days_available = 0
+    current_mask = int.from_bytes(current_present, "little")
+    for offset in range(1, offsets + 1):
+        lo = current_start - offset * stride
+        if current_mask & int.from_bytes(present[lo:lo + current_len], "little"):
+            days_available += 1
+
+    # Running sums down each day-column: prefix[i] = row[i] + prefix[i - stride].
+    sum_prefix = array("d", values)
+    count_prefix = array("d", map(float, present))
+    for row_start in range(stride, size, stride):
+        row_end = min(row_start + stride, size)
+        prev = slice(row_start - stride, row_end - stride)
+        sum_prefix[row_start:row_end] = array(
+            "d", map(operator.add, sum_prefix[row_start:row_end], sum_prefix[prev])
+        )
+        count_prefix[row_start:row_end] = array(
+            "d", map(operator.add, count_prefix[row_start:row_end], count_prefix[prev])
+        )
 
-            rows.append(
-                {
-                    "date": day_start_local.strftime("%Y-%m-%d"),
-                    "label": day_start_local.strftime("%a"),
-                    "display_date": day_start_local.strftime("%a, %d %b"),
-                    "amount_used": float(total_amount_used),
-                    "is_today": day_offset == 0,
-                }
+    newest = slice(current_start - stride, size - stride)
+    oldest = slice(current_start - (offsets + 1) * stride, size - (offsets + 1) * stride)
+    sums = list(map(operator.sub, sum_prefix[newest], sum_prefix[oldest]))
+    counts = list(map(operator.sub, count_prefix[newest], count_prefix[oldest]))
+
+    series = []
+    for offset in range(current_len):
+        if not current_present[offset]:
+            continue
+        count = int(counts[offset]) if offsets else 0
+        series.append(
+            (
+                first_current + offset * step,
+                sums[offset] / count if count else None,
+                count,
             )
+        )
 
+    return series, days_available
+
+
+def downsample_lttb(rows, max_points):
+    """Reduce ``(bucket_time, amount_used)`` rows to ``max_points`` with LTTB.
+
+    Largest-Triangle-Three-Buckets keeps the first and last rows and, from
+    each of ``max_points - 2`` equal slices in between, the row forming the
+    largest triangle with the previously kept row and the next slice's
+    average. Peaks and dips survive, and kept rows are returned unchanged, so
+    each still covers one ``group``-minute bucket. One pass over the rows.
+    """
+    count = len(rows)
+    if max_points >= count or max_points < 3:
         return rows
-    except sqlite3.Error as e:
-        logger.error(f"Database error fetching daily amount usage: {e}")
-        return []
-    finally:
-        if conn:
-            conn.close()
+
+    # Offsets from the first bucket; only relative positions matter.
+    first_time = rows[0][0]
+    xs = [(bucket_time - first_time).total_seconds() for bucket_time, _ in rows]
+    ys = [amount_used for _, amount_used in rows]
+    slice_size = (count - 2) / (max_points - 2)
+
+    kept = [rows[0]]
+    anchor = 0
+    for index in range(max_points - 2):
+        start = int(index * slice_size) + 1
+        end = int((index + 1) * slice_size) + 1
+
+        next_end = min(int((index + 2) * slice_size) + 1, count)
+        if index == max_points - 3:
+            next_x, next_y = xs[-1], ys[-1]
+        else:
+            next_count = next_end - end
+            next_x = sum(xs[end:next_end]) / next_count
+            next_y = sum(ys[end:next_end]) / next_count
+
+        anchor_x, anchor_y = xs[anchor], ys[anchor]
+        best, best_area = start, -1.0
+        for candidate in range(start, end):
+            area = abs(
+                (anchor_x - next_x) * (ys[candidate] - anchor_y)
+                - (anchor_x - xs[candidate]) * (next_y - anchor_y)
+            )
+            if area > best_area:
+                best, best_area = candidate, area
+
+        kept.append(rows[best])
+        anchor = best
+
+    kept.append(rows[-1])
+    return kept
 
 
 def serialize_bucket_amount_rows(rows):
@@ -270,17 +421,86 @@ def serialize_bucket_amount_rows(rows):
     return data
 
 
-def create_dashboard_bp(api_client, config, state=None):
+def chart_bucket_slot(args):
+    """Cache slot for chart endpoints: the current ``group``-minute bucket."""
+    try:
+        group_minutes = min(max(int(args.get("group", 30)), 1), 1440)
+    except ValueError:
+        group_minutes = 30
+
+    step = group_minutes * 60
+    slot = int(time.time()) // step
+    return slot, slot * step
+
+
+def local_day_slot(args):
+    """Cache slot for daily totals: the current local calendar day."""
+    timezone = pytz.timezone(LOCAL_DAILY_USAGE_TIMEZONE)
+    now_local = datetime.now(timezone)
+    today_start_local = timezone.localize(
+        datetime(now_local.year, now_local.month, now_local.day)
+    )
+    return today_start_local.strftime("%Y-%m-%d"), to_epoch(today_start_local)
+
+
+def parse_export_bound(value, timezone_name, is_end=False):
+    """Parse an ``/export`` range bound into epoch seconds.
+
+    Accepts an ISO date or datetime. Values without an offset are local to
+    ``timezone_name``; a date-only ``end`` includes that whole day.
+    """
+    parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if is_end and len(value) == 10:
+        parsed += timedelta(days=1)
+    if parsed.tzinfo is None:
+        parsed = pytz.timezone(timezone_name).localize(parsed)
+    return to_epoch(parsed)
+
+
+def create_dashboard_bp(meters, config):
+    """Dashboard routes for every meter in the ``MeterRegistry``.
+
+    Endpoints take an optional ``meter`` query parameter naming the meter id;
+    without it they serve the first configured meter.
+    """
     dashboard_bp = Blueprint("dashboard", __name__)
+    response_cache = ResponseCache()
+    # A reading for a closed day can still arrive this long after midnight.
+    closed_day_settle_seconds = (
+        MAX_READING_AGE_SECONDS
+        + config.WRITE_BEHIND_SECONDS
+        + CLOSED_DAY_SETTLE_MARGIN_SECONDS
+    )
+
+    def data_version(args):
+        meter = meters.get(args.get("meter"))
+        return (
+            get_data_version(config.DATABASE),
+            meter.state.data_updated_at if meter else None,
+        )
+
+    def with_meter(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            meter = meters.get(request.args.get("meter"))
+            if meter is None:
+                return jsonify({"error": "Unknown meter"}), 404
+            return view(meter, *args, **kwargs)
+
+        return wrapper
 
     @dashboard_bp.route("/dash_data")
-    def dashboard():
+    @cached_json_response(response_cache, data_version, chart_bucket_slot)
+    @with_meter
+    def dashboard(meter):
         try:
             try:
                 interval_hours = min(max(int(request.args.get("interval", 24)), 1), 720)
                 group_minutes = min(max(int(request.args.get("group", 30)), 1), 1440)
+                max_points = request.args.get("max_points")
+                max_points = min(max(int(max_points), 3), 10000) if max_points else None
             except ValueError:
-                return jsonify({"error": "Invalid interval or group parameter"}), 400
+                return jsonify({"error": "Invalid interval, group, or max_points parameter"}), 400
 
             now_utc = datetime.utcnow().replace(tzinfo=pytz.utc)
             interval_start_utc = now_utc - timedelta(hours=interval_hours)
@@ -293,7 +513,10 @@ def create_dashboard_bp(api_client, config, state=None):
                 interval_start_utc,
                 now_utc,
                 group_minutes,
+                meter.id,
             )
+            if max_points:
+                rows = downsample_lttb(rows, max_points)
 
             return jsonify(serialize_bucket_amount_rows(rows))
 
@@ -302,70 +525,67 @@ def create_dashboard_bp(api_client, config, state=None):
             return jsonify({"error": "Internal server error"}), 500
 
     @dashboard_bp.route("/dash_compare")
-    def dash_compare():
+    @cached_json_response(response_cache, data_version, chart_bucket_slot)
+    @with_meter
+    def dash_compare(meter):
         """Return historical averaged comparison series for chart overlay."""
         try:
             try:
                 interval_hours = min(max(int(request.args.get("interval", 24)), 1), 720)
                 group_minutes = min(max(int(request.args.get("group", 30)), 1), 1440)
                 compare_days = min(max(int(request.args.get("days", 7)), 1), 30)
+                max_points = request.args.get("max_points")
+                max_points = min(max(int(max_points), 3), 10000) if max_points else None
             except ValueError:
                 return (
-                    jsonify({"error": "Invalid interval, group, or days parameter"}),
+                    jsonify({"error": "Invalid interval, group, days, or max_points parameter"}),
                     400,
                 )
 
             now_utc = datetime.utcnow().replace(tzinfo=pytz.utc)
             interval_start_utc = now_utc - timedelta(hours=interval_hours)
 
-            current_rows = get_bucketed_amount_usage(
+            compare_rows, days_available = get_compare_series(
                 config.DATABASE,
                 interval_start_utc,
                 now_utc,
                 group_minutes,
+                compare_days,
+                meter.id,
             )
-
-            historical_rows = get_bucketed_amount_usage(
-                config.DATABASE,
-                interval_start_utc - timedelta(days=compare_days),
-                now_utc - timedelta(days=1),
-                group_minutes,
-            )
-            historical_map = {
-                bucket_time: amount for bucket_time, amount in historical_rows
-            }
-
-            points = []
-            day_offsets_with_data = set()
-
-            for bucket_time, _ in current_rows:
-                historical_values = []
-                for day_offset in range(1, compare_days + 1):
-                    shifted_bucket = bucket_time - timedelta(days=day_offset)
-                    amount = historical_map.get(shifted_bucket)
-                    if amount is None:
-                        continue
-                    historical_values.append(amount)
-                    day_offsets_with_data.add(day_offset)
-
-                avg_amount_used = None
-                if historical_values:
-                    avg_amount_used = sum(historical_values) / len(historical_values)
-
-                points.append(
-                    {
-                        "timestamp": pytz.utc.localize(bucket_time).strftime(
-                            "%a, %d %b %Y %H:%M:%S GMT"
+            if max_points and len(compare_rows) > max_points:
+                # Keep the buckets /dash_data keeps for the same max_points,
+                # so every overlay value lines up with a drawn point.
+                kept = {
+                    to_epoch(bucket_time)
+                    for bucket_time, _ in downsample_lttb(
+                        get_bucketed_amount_usage(
+                            config.DATABASE,
+                            interval_start_utc,
+                            now_utc,
+                            group_minutes,
+                            meter.id,
                         ),
-                        "avg_amount_used": avg_amount_used,
-                        "sample_count": len(historical_values),
-                    }
-                )
+                        max_points,
+                    )
+                }
+                compare_rows = [row for row in compare_rows if row[0] in kept]
+
+            points = [
+                {
+                    "timestamp": datetime.fromtimestamp(bucket, pytz.utc).strftime(
+                        "%a, %d %b %Y %H:%M:%S GMT"
+                    ),
+                    "avg_amount_used": avg_amount_used,
+                    "sample_count": sample_count,
+                }
+                for bucket, avg_amount_used, sample_count in compare_rows
+            ]
 
             return jsonify(
                 {
                     "days_requested": compare_days,
-                    "days_available": len(day_offsets_with_data),
+                    "days_available": days_available,
                     "points": points,
                 }
             )
@@ -374,7 +594,9 @@ def create_dashboard_bp(api_client, config, state=None):
             return jsonify({"error": "Internal server error"}), 500
 
     @dashboard_bp.route("/daily_usage")
-    def daily_usage():
+    @cached_json_response(response_cache, data_version, local_day_slot)
+    @with_meter
+    def daily_usage(meter):
         """Return local-day amount-used totals for the last few days."""
         try:
             try:
@@ -385,7 +607,12 @@ def create_dashboard_bp(api_client, config, state=None):
             return jsonify(
                 {
                     "timezone": LOCAL_DAILY_USAGE_TIMEZONE,
-                    "points": get_daily_amount_usage(config.DATABASE, days=days),
+                    "points": get_daily_amount_usage(
+                        config.DATABASE,
+                        days=days,
+                        meter_id=meter.id,
+                        settle_seconds=closed_day_settle_seconds,
+                    ),
                 }
             )
         except Exception as e:
@@ -393,10 +620,11 @@ def create_dashboard_bp(api_client, config, state=None):
             return jsonify({"error": "Internal server error"}), 500
 
     @dashboard_bp.route("/live_status")
-    def live_status():
+    @with_meter
+    def live_status(meter):
         """Return latest data for live widgets (dial and source badge)."""
-        latest = get_latest_power_snapshot(config.DATABASE)
-        dg_status = build_dg_status(state)
+        latest = get_latest_power_snapshot(meter.state.recent_readings)
+        dg_status = build_dg_status(meter.state)
 
         if not latest:
             return jsonify(
@@ -432,7 +660,8 @@ def create_dashboard_bp(api_client, config, state=None):
         )
 
     @dashboard_bp.route("/live_trend")
-    def live_trend():
+    @with_meter
+    def live_trend(meter):
         """Return short-window present load data for sparkline rendering."""
         try:
             window_minutes = int(request.args.get("minutes", 15))
@@ -440,7 +669,9 @@ def create_dashboard_bp(api_client, config, state=None):
             return jsonify({"error": "Invalid minutes parameter"}), 400
 
         window_minutes = min(max(window_minutes, 5), 120)
-        points = get_recent_present_loads(config.DATABASE, minutes=window_minutes)
+        points = get_recent_present_loads(
+            meter.state.recent_readings, minutes=window_minutes
+        )
 
         return jsonify(
             {
@@ -449,14 +680,113 @@ def create_dashboard_bp(api_client, config, state=None):
             }
         )
 
+    @dashboard_bp.route("/forecast")
+    @with_meter
+    def forecast(meter):
+        """Return the projected balance depletion time and low-balance alert date."""
+        latest = get_latest_power_snapshot(meter.state.recent_readings)
+        threshold = meter.config.LOW_BALANCE_THRESHOLD
+        threshold = float(threshold) if threshold else None
+
+        projection = None
+        if latest:
+            projection = meter.state.forecast.project(
+                latest["balance"], time.time(), threshold
+            )
+
+        return jsonify(
+            {
+                "balance": latest["balance"] if latest else None,
+                "timezone": meter.state.forecast.timezone.zone,
+                "status": "ok" if projection else "insufficient_data",
+                **(projection or {}),
+            }
+        )
+
+    @dashboard_bp.route("/live_stream")
+    @with_meter
+    def live_stream(meter):
+        """Push each newly stored reading to the browser via Server-Sent Events."""
+        initial_messages = []
+        latest = build_live_update(meter.state)
+        if latest:
+            initial_messages.append(format_sse("reading", latest))
+
+        return Response(
+            meter.state.live_updates.stream(initial_messages),
+            mimetype="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
+
+    @dashboard_bp.route("/export")
+    @with_meter
+    def export(meter):
+        """Stream stored readings for a date range as CSV or NDJSON."""
+        export_format = request.args.get("format", "csv")
+        if export_format not in EXPORT_FORMATS:
+            return jsonify({"error": "Invalid format parameter"}), 400
+
+        try:
+            start_epoch = 0
+            end_epoch = int(time.time()) + 1
+            if request.args.get("start"):
+                start_epoch = parse_export_bound(
+                    request.args["start"], LOCAL_DAILY_USAGE_TIMEZONE
+                )
+            if request.args.get("end"):
+                end_epoch = parse_export_bound(
+                    request.args["end"], LOCAL_DAILY_USAGE_TIMEZONE, is_end=True
+                )
+        except ValueError:
+            return jsonify({"error": "Invalid start or end parameter"}), 400
+
+        compress = request.args.get("gzip", "0").lower() in ("1", "true", "yes")
+        mimetype, extension = EXPORT_FORMATS[export_format]
+        timezone = pytz.timezone(LOCAL_DAILY_USAGE_TIMEZONE)
+        meter_suffix = "" if meter.id == DEFAULT_METER_ID else f"_{meter.id}"
+        filename = (
+            f"power_usage{meter_suffix}_{datetime.fromtimestamp(start_epoch, timezone):%Y%m%d}"
+            f"_{datetime.fromtimestamp(end_epoch - 1, timezone):%Y%m%d}.{extension}"
+        )
+        if compress:
+            mimetype = "application/gzip"
+            filename += ".gz"
+
+        if not acquire_export_slot():
+            return jsonify({"error": "Too many exports in progress; try again shortly"}), 503
+
+        response = Response(
+            export_stream(
+                config.DATABASE,
+                start_epoch,
+                end_epoch,
+                export_format,
+                compress,
+                meter.id,
+            ),
+            mimetype=mimetype,
+            headers={
+                "Content-Disposition": f'attachment; filename="{filename}"',
+                "X-Accel-Buffering": "no",
+            },
+        )
+        response.call_on_close(release_export_slot)
+        return response
+
     @dashboard_bp.route("/")
     def index():
-        home_data = api_client.fetch_home_data()
-        recent_recharges = get_recent_recharges(config.DATABASE)
-        dg_status = build_dg_status(state)
+        meter = meters.get(request.args.get("meter"))
+        if meter is None:
+            abort(404)
 
+        home_data, home_data_age = meter.home_data_cache.get_or_refresh()
+        recent_recharges = get_recent_recharges(config.DATABASE, meter_id=meter.id)
+        dg_status = build_dg_status(meter.state)
+
+        data = None
         if home_data and home_data.get("Data"):
-            data = home_data["Data"]
+            # Copy so the derived averages never leak into the shared cache.
+            data = dict(home_data["Data"])
             now = datetime.now()
 
             # Daily Average
@@ -491,9 +821,18 @@ def create_dashboard_bp(api_client, config, state=None):
 
         return render_template(
             "dashboard.html",
-            home_data=home_data.get("Data") if home_data else None,
+            home_data=data,
+            home_data_age_minutes=(
+                int(home_data_age // 60) if home_data_age is not None else None
+            ),
+            home_data_is_stale=(
+                home_data_age is not None
+                and home_data_age > 2 * config.HOME_DATA_REFRESH_SECONDS
+            ),
             recent_recharges=recent_recharges,
             dg_status=dg_status,
+            meters=[(other.id, other.name) for other in meters],
+            current_meter=meter.id if len(meters) > 1 else None,
         )
 
     return dashboard_bp
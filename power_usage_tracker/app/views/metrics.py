@@ -0,0 +1,14 @@
+from flask import Blueprint, Response
+
+from ..metrics import CONTENT_TYPE, render
+
+
+def create_metrics_bp():
+    metrics_bp = Blueprint("metrics", __name__)
+
+    @metrics_bp.route("/metrics")
+    def metrics():
+        """Expose metrics for Prometheus to scrape."""
+        return Response(render(), content_type=CONTENT_TYPE)
+
+    return metrics_bp
@@ -0,0 +1,122 @@
+import logging
+import sqlite3
+import threading
+import time
+
+from .db import write_connection
+from .rollups import apply_readings
+
+logger = logging.getLogger(__name__)
+
+
+class WriteBehindBuffer:
+    """Collects stored readings in memory and writes them in one transaction.
+
+    ``store_data`` hands each new reading here instead of committing it, and
+    the buffer is flushed once it holds ``max_rows`` readings or its oldest
+    reading is ``max_age_seconds`` old. In-memory state (live endpoints, SSE,
+    response caches) is updated immediately, so only database-backed views
+    wait for the flush; ``flush_listeners`` are called with the ids of the
+    meters whose rows were committed, so those views can be refreshed.
+    Readings still pending when the process dies are lost, so the buffer is
+    also flushed on shutdown.
+    """
+
+    def __init__(self, database_path, max_rows, max_age_seconds):
+        self.database_path = database_path
+        self.max_rows = max_rows
+        self.max_age_seconds = max_age_seconds
+        self._rows = []
+        self._snapshots = {}
+        self._oldest_at = None
+        self._lock = threading.Lock()
+        # Serializes flushes so an older state snapshot can never overwrite a newer one.
+        self._flush_lock = threading.Lock()
+        self.flush_listeners = []
+
+    def __len__(self):
+        return len(self._rows)
+
+    def add(self, row, snapshot_key, snapshot):
+        """Queue one ``power_usage`` row and its meter's latest state snapshot.
+
+        ``row`` is ``(meter_id, timestamp, ts_epoch, balance, present_load,
+        amount_used, recharge_amount)``; the snapshot is the serialized
+        ``app_metadata`` value for ``snapshot_key``. Returns ``True`` when a
+        flush is due.
+        """
+        with self._lock:
+            if self._oldest_at is None:
+                self._oldest_at = time.monotonic()
+            self._rows.append(row)
+            self._snapshots[snapshot_key] = snapshot
+            return self._is_due()
+
+    def add_snapshot(self, snapshot_key, snapshot):
+        """Queue a state snapshot for a tick that stored no reading.
+
+        It is written by the next flush, which is due ``max_age_seconds``
+        after the oldest pending write. Returns ``True`` when a flush is due.
+        """
+        with self._lock:
+            if self._oldest_at is None:
+                self._oldest_at = time.monotonic()
+            self._snapshots[snapshot_key] = snapshot
+            return self._is_due()
+
+    def _is_due(self):
+        return self._oldest_at is not None and (
+            len(self._rows) >= self.max_rows
+            or time.monotonic() - self._oldest_at >= self.max_age_seconds
+        )
+
+    def flush(self):
+        """Write every pending reading, its rollups and snapshots in one commit.
+
+        On a database error the readings are put back and retried on the next
+        flush.
+        """
+        with self._flush_lock:
+            with self._lock:
+                rows, self._rows = self._rows, []
+                snapshots, self._snapshots = self._snapshots, {}
+                oldest_at, self._oldest_at = self._oldest_at, None
+            if not rows and not snapshots:
+                return
+
+            started = time.perf_counter()
+            try:
+                with write_connection(self.database_path) as conn:
+                    conn.executemany(
+                        '''
+                        INSERT INTO power_usage (meter_id, timestamp, ts_epoch, balance, present_load, amount_used, recharge_amount)
+                        VALUES (?, ?, ?, ?, ?, ?, ?)
+                        ''',
+                        rows
+                    )
+                    meter_ids = {row[0] for row in rows}
+                    for meter_id in meter_ids:
+                        apply_readings(
+                            conn,
+                            [(row[2], row[5], row[6]) for row in rows if row[0] == meter_id],
+                            meter_id,
+                        )
+                    conn.executemany(
+                        '''
+                        INSERT INTO app_metadata (key, value) VALUES (?, ?)
+                        ON CONFLICT(key) DO UPDATE SET value = excluded.value
+                        ''',
+                        list(snapshots.items())
+                    )
+            except sqlite3.Error as e:
+                logger.error(f"Database error flushing {len(rows)} buffered readings; will retry: {e}")
+                with self._lock:
+                    self._rows[:0] = rows
+                    self._snapshots = {**snapshots, **self._snapshots}
+                    self._oldest_at = oldest_at
+                return
+
+            logger.debug(f"Flushed {len(rows)} buffered readings in {(time.perf_counter() - started) * 1000:.2f} ms")
+            if meter_ids:
+                for listener in self.flush_listeners:
+                    listener(meter_ids)
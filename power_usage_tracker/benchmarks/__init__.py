@@ -0,0 +1,5 @@
+"""Offline benchmarks for dashboard queries and ingestion.
+
+Run from the ``power_usage_tracker`` directory, e.g.
+``python -m benchmarks.compare_bench``.
+"""
@@ -0,0 +1,100 @@
+"""Benchmark /dash_compare: legacy nested loop vs single-scan arrays.
+
+Builds a temporary database holding a month of synthetic 30-second readings
+(plus the comparison history before it) and times both implementations for
+the heaviest dashboard request, ``interval=720&group=1&days=30``.
+"""
+import argparse
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import pytz
+
+from app.views.dashboard import get_bucketed_amount_usage, get_compare_series
+from benchmarks.generator import build_database
+
+
+def legacy_compare(database_path, interval_start_utc, now_utc, group_minutes, compare_days):
+    """The original two-query, nested-loop /dash_compare computation."""
+    current_rows = get_bucketed_amount_usage(
+        database_path, interval_start_utc, now_utc, group_minutes
+    )
+    historical_rows = get_bucketed_amount_usage(
+        database_path,
+        interval_start_utc - timedelta(days=compare_days),
+        now_utc - timedelta(days=1),
+        group_minutes,
+    )
+    historical_map = {bucket_time: amount for bucket_time, amount in historical_rows}
+
+    series = []
+    day_offsets_with_data = set()
+    for bucket_time, _ in current_rows:
+        historical_values = []
+        for day_offset in range(1, compare_days + 1):
+            amount = historical_map.get(bucket_time - timedelta(days=day_offset))
+            if amount is None:
+                continue
+            historical_values.append(amount)
+            day_offsets_with_data.add(day_offset)
+
+        avg_amount_used = None
+        if historical_values:
+            avg_amount_used = sum(historical_values) / len(historical_values)
+        series.append(
+            (
+                int(pytz.utc.localize(bucket_time).timestamp()),
+                avg_amount_used,
+                len(historical_values),
+            )
+        )
+    return series, len(day_offsets_with_data)
+
+
+def best_of(func, repeats):
+    timings = []
+    result = None
+    for _ in range(repeats):
+        started = time.perf_counter()
+        result = func()
+        timings.append(time.perf_counter() - started)
+    return min(timings), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--interval", type=int, default=720, help="window in hours")
+    parser.add_argument("--group", type=int, default=1, help="bucket size in minutes")
+    parser.add_argument("--days", type=int, default=30, help="comparison days")
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database_path = os.path.join(tmp, "bench.db")
+        history_days = args.interval // 24 + args.days + 1
+        row_count = build_database(database_path, history_days)
+
+        now_utc = datetime.utcnow().replace(tzinfo=pytz.utc)
+        interval_start_utc = now_utc - timedelta(hours=args.interval)
+        call_args = (database_path, interval_start_utc, now_utc, args.group, args.days)
+
+        legacy_seconds, legacy_result = best_of(lambda: legacy_compare(*call_args), args.repeats)
+        new_seconds, new_result = best_of(lambda: get_compare_series(*call_args), args.repeats)
+
+    matches = len(legacy_result[0]) == len(new_result[0]) and all(
+        a[0] == b[0] and a[2] == b[2]
+        and (a[1] is None if b[1] is None else abs(a[1] - b[1]) < 1e-9)
+        for a, b in zip(legacy_result[0], new_result[0])
+    )
+
+    print(f"rows: {row_count}  buckets: {len(new_result[0])}  days_available: {new_result[1]}")
+    print(f"legacy:      {legacy_seconds * 1000:9.1f} ms")
+    print(f"single-scan: {new_seconds * 1000:9.1f} ms")
+    print(f"speedup:     {legacy_seconds / new_seconds:9.1f}x")
+    print(f"results match: {matches and legacy_result[1] == new_result[1]}")
+
+
+if __name__ == "__main__":
+    main()
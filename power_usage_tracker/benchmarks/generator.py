@@ -0,0 +1,127 @@
+"""Synthetic ``power_usage`` history for benchmarks.
+
+Produces 30-second readings with a daily load profile, occasional DG
+periods billed at a higher tariff, top-up recharges when the balance runs
+low, and feed gaps where no readings arrive. Rows are written the way
+``store_data`` would store them: only when the balance changes, with
+``amount_used``/``recharge_amount`` derived from the balance delta.
+
+    python -m benchmarks.generator bench.db --days 365
+"""
+import argparse
+import math
+import random
+import time
+from datetime import datetime, timedelta
+
+from app.data_manager import init_db
+from app.db import write_connection
+from app.rollups import backfill_rollups, to_epoch
+
+EB_TARIFF = 8.33
+DG_TARIFF = 20.0
+RECHARGE_BELOW = 300.0
+RECHARGE_AMOUNT = 3000.0
+CHUNK_ROWS = 20000
+
+
+def daily_load_kw(local_hour, rng):
+    """Household-like load: low overnight, morning and evening peaks."""
+    base = 0.35
+    morning = 0.9 * math.exp(-((local_hour - 8) ** 2) / 3)
+    evening = 1.6 * math.exp(-((local_hour - 20.5) ** 2) / 5)
+    return max(0.05, rng.gauss(base + morning + evening, 0.2))
+
+
+def generate_readings(days, interval_seconds=30, seed=7, end=None):
+    """Yield ``(timestamp_utc, balance, present_load, amount_used, recharge_amount)``."""
+    rng = random.Random(seed)
+    end = end or datetime.utcnow().replace(microsecond=0)
+    timestamp = end - timedelta(days=days)
+
+    balance = 2500.0
+    stored_balance = None
+    dg_until = None
+    gap_until = None
+
+    while timestamp < end:
+        if gap_until and timestamp < gap_until:
+            timestamp += timedelta(seconds=interval_seconds)
+            continue
+        if rng.random() < 1 / 5000:
+            gap_until = timestamp + timedelta(minutes=rng.randint(5, 180))
+            continue
+
+        if dg_until is None and rng.random() < 1 / 4000:
+            dg_until = timestamp + timedelta(minutes=rng.randint(10, 120))
+        if dg_until and timestamp >= dg_until:
+            dg_until = None
+
+        local_hour = ((timestamp.hour + 5.5) + timestamp.minute / 60) % 24
+        load_kw = daily_load_kw(local_hour, rng)
+        tariff = DG_TARIFF if dg_until else EB_TARIFF
+        balance -= load_kw * interval_seconds / 3600 * tariff
+        if balance < RECHARGE_BELOW:
+            balance += RECHARGE_AMOUNT
+
+        rounded = round(balance, 2)
+        if rounded != stored_balance:
+            amount_used = 0.0
+            recharge_amount = 0.0
+            if stored_balance is not None:
+                change = stored_balance - rounded
+                if 0 < change < 50:
+                    amount_used = round(change, 2)
+                elif change < 0:
+                    recharge_amount = round(-change, 2)
+            yield (timestamp, rounded, round(load_kw, 2), amount_used, recharge_amount)
+            stored_balance = rounded
+
+        timestamp += timedelta(seconds=interval_seconds)
+
+
+def build_database(database_path, days, interval_seconds=30, seed=7):
+    """Create ``database_path`` with ``days`` of history and its rollups.
+
+    Returns the number of stored rows.
+    """
+    init_db(database_path)
+    rows = 0
+    chunk = []
+    with write_connection(database_path) as conn:
+        for row in generate_readings(days, interval_seconds, seed):
+            chunk.append(row)
+            if len(chunk) >= CHUNK_ROWS:
+                rows += _insert(conn, chunk)
+                chunk = []
+        rows += _insert(conn, chunk)
+        backfill_rollups(conn.cursor())
+    return rows
+
+
+def _insert(conn, chunk):
+    conn.executemany(
+        '''
+        INSERT INTO power_usage (timestamp, ts_epoch, balance, present_load, amount_used, recharge_amount)
+        VALUES (?, ?, ?, ?, ?, ?)
+        ''',
+        [(row[0], to_epoch(row[0])) + row[1:] for row in chunk],
+    )
+    return len(chunk)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("database", help="path of the database to create")
+    parser.add_argument("--days", type=int, default=90)
+    parser.add_argument("--interval", type=int, default=30, help="seconds between readings")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    rows = build_database(args.database, args.days, args.interval, args.seed)
+    print(f"wrote {rows} rows in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
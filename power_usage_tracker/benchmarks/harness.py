@@ -0,0 +1,164 @@
+"""Time dashboard queries and ingestion across database sizes.
+
+For each history size a fresh synthetic database is generated and every
+benchmark is run ``--repeats`` times. Results are written as JSON so runs
+can be compared; ``--baseline`` flags benchmarks that got slower.
+
+    python -m benchmarks --sizes 30,180,365 --output results.json
+    python -m benchmarks --baseline results.json
+"""
+import argparse
+import json
+import os
+import platform
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import pytz
+
+from app.data_manager import warm_start_state
+from app.state import State
+from app.views import dashboard
+from benchmarks.generator import build_database
+from benchmarks.ingest_bench import BenchConfig, run_ticks
+
+DEFAULT_SIZES = (30, 180, 365)
+REGRESSION_THRESHOLD = 0.20
+
+
+def time_call(func, repeats):
+    timings = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started)
+    return timings
+
+
+def benchmarks_for(database_path, state):
+    """Return ``{name: zero-argument callable}`` for one database."""
+    def window(hours):
+        now_utc = datetime.utcnow().replace(tzinfo=pytz.utc)
+        return now_utc - timedelta(hours=hours), now_utc
+
+    def bucketed(hours, group):
+        start, end = window(hours)
+        return dashboard.get_bucketed_amount_usage(database_path, start, end, group)
+
+    def compare(hours, group, days):
+        start, end = window(hours)
+        return dashboard.get_compare_series(database_path, start, end, group, days)
+
+    def daily_cold():
+        dashboard._closed_day_totals.clear()
+        return dashboard.get_daily_amount_usage(database_path, days=30)
+
+    return {
+        "bucketed_24h_g30": lambda: bucketed(24, 30),
+        "bucketed_720h_g1": lambda: bucketed(720, 1),
+        "bucketed_720h_g60": lambda: bucketed(720, 60),
+        "daily_usage_30d_cold": daily_cold,
+        "daily_usage_30d_warm": lambda: dashboard.get_daily_amount_usage(database_path, days=30),
+        "dash_compare_24h_g30_d7": lambda: compare(24, 30, 7),
+        "dash_compare_720h_g1_d30": lambda: compare(720, 1, 30),
+        "recent_present_loads_15m": lambda: dashboard.get_recent_present_loads(
+            state.recent_readings, minutes=15
+        ),
+    }
+
+
+def run(sizes, repeats, ticks):
+    results = []
+    for days in sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            database_path = os.path.join(tmp, "bench.db")
+            rows = build_database(database_path, days)
+            state = State()
+            warm_start_state(state, database_path)
+
+            for name, func in benchmarks_for(database_path, state).items():
+                func()  # warm page cache and pools
+                results.append(summarize(name, days, rows, time_call(func, repeats)))
+
+            timings = run_ticks(BenchConfig(database_path), state, ticks)
+            results.append(summarize("store_data_tick", days, rows, timings))
+
+        print(f"finished {days} days ({rows} rows)", file=sys.stderr)
+    return results
+
+
+def summarize(name, days, rows, timings):
+    timings = sorted(timings)
+    return {
+        "benchmark": name,
+        "history_days": days,
+        "rows": rows,
+        "runs": len(timings),
+        "min_ms": round(timings[0] * 1000, 4),
+        "median_ms": round(statistics.median(timings) * 1000, 4),
+        "p95_ms": round(timings[min(len(timings) - 1, int(len(timings) * 0.95))] * 1000, 4),
+    }
+
+
+def find_regressions(results, baseline, threshold=REGRESSION_THRESHOLD):
+    """Compare median timings against a previous run's results."""
+    previous = {
+        (entry["benchmark"], entry["history_days"]): entry
+        for entry in baseline.get("results", [])
+    }
+    regressions = []
+    for entry in results:
+        before = previous.get((entry["benchmark"], entry["history_days"]))
+        if not before or not before["median_ms"]:
+            continue
+        change = entry["median_ms"] / before["median_ms"] - 1
+        if change > threshold:
+            regressions.append((entry, before, change))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default=",".join(str(size) for size in DEFAULT_SIZES),
+                        help="comma-separated history sizes in days")
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--ticks", type=int, default=200, help="store_data ticks per size")
+    parser.add_argument("--output", help="write JSON results to this file")
+    parser.add_argument("--baseline", help="JSON results of a previous run to compare against")
+    parser.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD,
+                        help="relative median slowdown reported as a regression")
+    args = parser.parse_args()
+
+    sizes = [int(size) for size in args.sizes.split(",") if size]
+    report = {
+        "generated_at": datetime.utcnow().isoformat() + "Z",
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "platform": platform.platform(),
+        "results": run(sizes, args.repeats, args.ticks),
+    }
+
+    for entry in report["results"]:
+        print(f"{entry['history_days']:>5}d  {entry['benchmark']:<28} "
+              f"median {entry['median_ms']:>10.3f} ms  min {entry['min_ms']:>10.3f} ms")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = find_regressions(report["results"], json.load(f), args.threshold)
+        for entry, before, change in regressions:
+            print(f"REGRESSION {entry['benchmark']} @ {entry['history_days']}d: "
+                  f"{before['median_ms']:.3f} -> {entry['median_ms']:.3f} ms (+{change:.0%})")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
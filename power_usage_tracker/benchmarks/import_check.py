@@ -0,0 +1,72 @@
+"""Check that re-importing a database's own export changes nothing.
+
+Builds a synthetic database, exports it, compacts readings past a retention
+window, exports again, then imports both files back into it. Exits non-zero
+when any row is inserted or any raw or daily total moves.
+
+    python -m benchmarks.import_check --days 5 --retention-days 2
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+from app.compaction import compact_raw_readings
+from app.config import DEFAULT_METER_ID
+from app.db import read_connection
+from app.export import export_stream
+from app.importer import import_readings
+from benchmarks.generator import build_database
+
+
+def totals(database_path):
+    with read_connection(database_path) as conn:
+        raw = conn.execute(
+            'SELECT COUNT(*), ROUND(SUM(amount_used), 2), ROUND(SUM(recharge_amount), 2) FROM power_usage'
+        ).fetchone()
+        daily = conn.execute(
+            'SELECT ROUND(SUM(amount_used), 2), ROUND(SUM(recharge_amount), 2) FROM power_usage_daily'
+        ).fetchone()
+    return {'rows': raw[0], 'amount_used': raw[1], 'recharge_amount': raw[2],
+            'daily_amount_used': daily[0], 'daily_recharge_amount': daily[1]}
+
+
+def export_to(database_path, path):
+    with open(path, 'wb') as f:
+        for block in export_stream(database_path, 0, int(time.time()) + 86400, meter_id=DEFAULT_METER_ID):
+            f.write(block)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--days", type=int, default=5)
+    parser.add_argument("--retention-days", type=int, default=2)
+    args = parser.parse_args()
+
+    failures = []
+    with tempfile.TemporaryDirectory() as tmp:
+        database_path = os.path.join(tmp, "check.db")
+        raw_export = os.path.join(tmp, "raw.csv")
+        compacted_export = os.path.join(tmp, "compacted.csv")
+
+        build_database(database_path, args.days)
+        export_to(database_path, raw_export)
+        removed = compact_raw_readings(database_path, args.retention_days)
+        export_to(database_path, compacted_export)
+        expected = totals(database_path)
+        print(f"compacted {removed} rows: {expected}")
+
+        for name, path in (("raw export", raw_export), ("compacted export", compacted_export)):
+            stats = import_readings(database_path, [path])
+            actual = totals(database_path)
+            print(f"{name}: {stats.summary()}")
+            if stats.inserted or stats.recomputed or actual != expected:
+                failures.append(f"{name}: {actual}")
+
+    if failures:
+        sys.exit("re-import changed the database:\n  " + "\n  ".join(failures))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""Benchmark per-tick ingestion latency of ``store_data``.
+
+Seeds a temporary database with synthetic history, warms ``State`` the way
+``create_app`` does, then times a run of fresh readings through
+``store_data``.
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import pytz
+
+from app.config import DEFAULT_METER_ID
+from app.data_manager import store_data, warm_start_state
+from app.state import State
+from app.write_behind import WriteBehindBuffer
+from benchmarks.generator import build_database
+
+
+class BenchConfig:
+    METER_ID = DEFAULT_METER_ID
+    ALERT_PREFIX = ''
+    LOW_BALANCE_THRESHOLD = None
+    TELEGRAM_BOT_TOKEN = None
+    TELEGRAM_CHAT_ID = None
+
+    def __init__(self, database_path):
+        self.DATABASE = database_path
+
+
+def run_ticks(config, state, ticks, write_buffer=None):
+    """Feed ``ticks`` readings through ``store_data`` and return per-tick seconds."""
+    kolkata_tz = pytz.timezone('Asia/Kolkata')
+    start = datetime.now(kolkata_tz)
+    balance = 4000.0
+    timings = []
+    for tick in range(ticks):
+        balance -= 0.07
+        data = {
+            'Data': {
+                'Balance': round(balance, 2),
+                'PresentLoad': 0.8,
+                'DG': 100.0,
+                'EB': 5000.0 + tick * 0.07,
+                'UpdatedOn': (start + timedelta(seconds=tick)).strftime('%d-%m-%Y %H:%M:%S'),
+            }
+        }
+        started = time.perf_counter()
+        store_data(data, state, config, write_buffer)
+        timings.append(time.perf_counter() - started)
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--history-days", type=int, default=30)
+    parser.add_argument("--ticks", type=int, default=500)
+    parser.add_argument(
+        "--write-behind-rows", type=int, default=0,
+        help="batch this many readings per commit (0 commits every reading)",
+    )
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database_path = os.path.join(tmp, "bench.db")
+        rows = build_database(database_path, args.history_days)
+        config = BenchConfig(database_path)
+        state = State()
+        warm_start_state(state, database_path)
+        write_buffer = None
+        if args.write_behind_rows:
+            write_buffer = WriteBehindBuffer(database_path, args.write_behind_rows, 3600)
+        timings = run_ticks(config, state, args.ticks, write_buffer)
+        if write_buffer is not None:
+            write_buffer.flush()
+
+    timings.sort()
+    print(f"history rows: {rows}  ticks: {len(timings)}")
+    print(f"mean: {statistics.mean(timings) * 1000:.3f} ms")
+    print(f"p50:  {timings[len(timings) // 2] * 1000:.3f} ms")
+    print(f"p95:  {timings[int(len(timings) * 0.95)] * 1000:.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,32 @@
+"""Print the query plan of every dashboard query against a database.
+
+Exits non-zero when any of them falls back to a full table scan.
+
+    python -m benchmarks.query_plans power_usage_index.db
+"""
+import sys
+
+from app.db import read_connection
+from app.query_plans import DASHBOARD_QUERIES, explain, is_full_scan
+
+
+def main():
+    if len(sys.argv) != 2:
+        sys.exit("usage: python -m benchmarks.query_plans DATABASE")
+
+    unindexed = []
+    with read_connection(sys.argv[1]) as conn:
+        for name, (sql, params) in DASHBOARD_QUERIES.items():
+            print(name)
+            for detail in explain(conn, sql, params):
+                full_scan = is_full_scan(detail)
+                if full_scan:
+                    unindexed.append(name)
+                print(f"  {'!!' if full_scan else '  '} {detail}")
+
+    if unindexed:
+        sys.exit(f"full table scans in: {', '.join(sorted(set(unindexed)))}")
+
+
+if __name__ == "__main__":
+    main()
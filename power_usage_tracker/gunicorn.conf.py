@@ -0,0 +1,74 @@
+"""Gunicorn settings for production serving: ``gunicorn app:create_app()``.
+
+Every worker serves the dashboard; the one holding the leader lock also runs
+the fetch and alert jobs (see ``app.leader``). Threaded workers keep
+long-lived ``/live_stream`` connections from tying up a whole process.
+"""
+import glob
+import logging
+import multiprocessing
+import os
+import tempfile
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '5000')}"
+workers = int(os.environ.get('POWER_USAGE_WEB_WORKERS', min(multiprocessing.cpu_count(), 4)))
+worker_class = 'gthread'
+threads = int(os.environ.get('POWER_USAGE_WEB_THREADS', 16))
+accesslog = '-'
+
+# Set when this server created the metrics directory, so it may remove it.
+_created_metrics_dir = None
+
+
+def _prepare_metrics_dir():
+    """Point ``PROMETHEUS_MULTIPROC_DIR`` at the directory workers share metrics in.
+
+    Without a configured directory each run gets a fresh one, so nothing from
+    a previous run is counted. A configured directory is used as given and
+    never cleared. It must be set before the app, and with it
+    ``prometheus_client``, is first imported.
+    """
+    global _created_metrics_dir
+    metrics_dir = os.environ.get('PROMETHEUS_MULTIPROC_DIR')
+    if metrics_dir:
+        os.makedirs(metrics_dir, exist_ok=True)
+        if glob.glob(os.path.join(metrics_dir, '*.db')):
+            logging.getLogger('gunicorn.error').warning(
+                f"{metrics_dir} already holds metric files; /metrics will include them. "
+                f"Empty it before starting, or leave PROMETHEUS_MULTIPROC_DIR unset."
+            )
+        return
+    _created_metrics_dir = tempfile.mkdtemp(prefix='power_usage_metrics-')
+    os.environ['PROMETHEUS_MULTIPROC_DIR'] = _created_metrics_dir
+
+
+def on_starting(server):
+    """Apply schema migrations once, before any worker starts."""
+    _prepare_metrics_dir()
+
+    from app.config import load_config
+    from app.data_manager import init_db
+    from app.db import close_all
+
+    init_db(load_config().DATABASE)
+    # Connections must not be inherited by forked workers.
+    close_all()
+
+
+def child_exit(server, worker):
+    """Stop reporting live gauges for a worker that has exited."""
+    from prometheus_client import multiprocess
+
+    multiprocess.mark_process_dead(worker.pid)
+
+
+def on_exit(server):
+    """Remove the metrics directory this server created."""
+    if not _created_metrics_dir:
+        return
+    for path in glob.glob(os.path.join(_created_metrics_dir, '*.db')):
+        os.remove(path)
+    try:
+        os.rmdir(_created_metrics_dir)
+    except OSError:
+        pass